@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Student_Registration, CameraConfiguration, Attendance
+from .models import Student_Registration, CameraConfiguration, CameraStatus, Attendance
+from .models import DailyDepartmentSummary, MonthlyStudentSummary
+from .summaries import refresh_attendance_summaries
 # Register your models here.
 
 # admin site customization for student registration model
@@ -35,9 +37,43 @@ class AttendanceAdmin(admin.ModelAdmin):
             obj.check_in_time = original.check_in_time
             obj.check_out_time = original.check_out_time
         super().save_model(request, obj, form, change)
+        refresh_attendance_summaries([obj])
+
+    # keep the summaries in step with rows deleted here
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_attendance_summaries([obj])
+
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset)
+        super().delete_queryset(request, queryset)
+        refresh_attendance_summaries(rows)
 
 # admin site customization for camera configuration model
 @admin.register(CameraConfiguration)
 class CameraConfigurationAdmin(admin.ModelAdmin):
-    list_display = ['name', 'camera_source', 'threshold']
+    list_display = ['name', 'camera_source', 'threshold', 'ann_nprobe', 'target_fps', 'frame_skip', 'engine', 'detection_scale', 'is_enabled']
+    list_editable = ['is_enabled']
     search_fields = ['name']
+
+# admin site customization for camera status model (written by the recognizer service)
+@admin.register(CameraStatus)
+class CameraStatusAdmin(admin.ModelAdmin):
+    list_display = ['camera', 'state', 'last_heartbeat', 'message']
+    readonly_fields = ['camera', 'state', 'message', 'last_heartbeat', 'stats']
+
+# admin site customization for the attendance summaries (maintained by the recognizer and
+# `manage.py backfill_attendance_summaries`, so read-only here)
+@admin.register(DailyDepartmentSummary)
+class DailyDepartmentSummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'department', 'present_count', 'checked_out_count', 'total_stay_seconds']
+    list_filter = ['department']
+    date_hierarchy = 'date'
+    readonly_fields = ['date', 'department', 'present_count', 'checked_out_count', 'total_stay_seconds']
+
+@admin.register(MonthlyStudentSummary)
+class MonthlyStudentSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student_registration', 'month', 'days_present', 'days_checked_out', 'total_stay_seconds']
+    search_fields = ['student_registration__name', 'student_registration__stu_id']
+    readonly_fields = ['student_registration', 'month', 'days_present', 'days_checked_out',
+                       'total_stay_seconds']
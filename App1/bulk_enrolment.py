@@ -0,0 +1,79 @@
+# Worker side of `manage.py bulk_enroll`: read a student image from the image directory or zip,
+# decode it and find its single face in a worker process. Django and the face modules are only
+# imported inside the functions, so spawned workers (Windows, macOS) can set Django up first.
+import os
+import signal
+import zipfile
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+_images = None  # per-process image source, opened by init_worker
+
+
+class ImageSource:
+    """Student images in a directory or a zip file, looked up by file name."""
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        if self.zip is not None:
+            names = [name for name in self.zip.namelist() if not name.endswith('/')]
+        else:
+            names = [os.path.relpath(os.path.join(root, name), path)
+                     for root, dirs, files in os.walk(path) for name in files]
+        # Rows may name an image by relative path or by bare file name
+        self.names = {}
+        for name in names:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                self.names.setdefault(name.replace(os.sep, '/'), name)
+                self.names.setdefault(os.path.basename(name), name)
+
+    # Function to find the image of a CSV row: its image column, else <stu_id>.<extension>
+    def find(self, image_name, stu_id):
+        if image_name:
+            return self.names.get(image_name.replace('\\', '/'))
+        for extension in IMAGE_EXTENSIONS:
+            name = self.names.get(f'{stu_id}{extension}')
+            if name:
+                return name
+        return None
+
+    def read(self, name):
+        if self.zip is not None:
+            return self.zip.read(name)
+        with open(os.path.join(self.path, name), 'rb') as image_file:
+            return image_file.read()
+
+
+def init_worker(images_path):
+    global _images
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl+C is handled by the parent, which ends the pool
+    import django
+    django.setup()  # no-op in forked workers
+
+    import torch
+    torch.set_num_threads(1)    # the pool already uses every core
+    _images = ImageSource(images_path)
+
+
+# Function run in the pool: returns (row number, 160x160 RGB crop or None, probability, reject reason)
+def detect_face(task):
+    import cv2
+    import numpy as np
+    from .recognition.engine import crop_face, get_engine
+
+    row_number, image_name = task
+    image = cv2.imdecode(np.frombuffer(_images.read(image_name), np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return row_number, None, 0.0, 'unreadable image'
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    faces = get_engine().detect([image])[0]
+    if not faces:
+        return row_number, None, 0.0, 'no face'
+    if len(faces) > 1:
+        return row_number, None, 0.0, f'multiple faces ({len(faces)})'
+    crop = crop_face(image, faces[0].box)
+    if crop is None:
+        return row_number, None, 0.0, 'face outside the image'
+    return row_number, crop, faces[0].probability, None
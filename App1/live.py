@@ -0,0 +1,100 @@
+# In-process pub/sub for the dashboards' live events. One reader thread per web process follows
+# the recognizer's /events stream (App1/streaming.py) and hands every event to each subscribed
+# async view, so any number of open dashboards cost one recognizer connection and no database
+# queries. The latest state of every camera is kept, so a new dashboard is filled in at once.
+import asyncio
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+
+
+class LiveFeed:
+    """Fan the recognizer's events out to asyncio queues, one per open dashboard."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers = set()    # (event loop, asyncio.Queue) pairs
+        self.cameras = {}           # camera pk -> latest camera event data
+        self.recognizer_alive = False
+        self.thread = None
+
+    def subscribe(self):
+        """Register the calling view; returns its queue and the events describing the current state."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self.lock:
+            self.subscribers.add(subscriber)
+            snapshot = [('recognizer', {'alive': self.recognizer_alive})]
+            snapshot += [('camera', data) for data in self.cameras.values()]
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='live-feed', daemon=True)
+                self.thread.start()
+        return subscriber, snapshot
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        with self.lock:
+            if event == 'camera':
+                self.cameras[data['id']] = data
+            elif event == 'recognizer':
+                self.recognizer_alive = data['alive']
+            for loop, messages in self.subscribers:
+                try:
+                    loop.call_soon_threadsafe(self.deliver, messages, (event, data))
+                except RuntimeError:
+                    pass    # the view's loop closed before it unsubscribed
+
+    # Runs on the subscriber's event loop; a dashboard that cannot keep up loses its oldest events
+    @staticmethod
+    def deliver(messages, item):
+        if messages.full():
+            messages.get_nowait()
+        messages.put_nowait(item)
+
+    def set_recognizer_alive(self, alive):
+        if alive != self.recognizer_alive:
+            if not alive:
+                self.cameras.clear()    # the last camera states are no longer current
+            self.publish('recognizer', {'alive': alive})
+
+    # Reader thread: follow the recognizer's event stream while anyone is subscribed
+    def run(self):
+        url = f"{settings.RECOGNIZER_STREAM_URL}/events"
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None  # the next subscriber starts a new reader
+                    return
+            try:
+                # The recognizer sends a keep-alive comment every 15 seconds
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    self.set_recognizer_alive(True)
+                    self.read_events(response)
+            except (urllib.error.URLError, OSError):
+                pass
+            self.set_recognizer_alive(False)
+            time.sleep(settings.RECOGNIZER_POLL_INTERVAL)
+
+    def read_events(self, response):
+        event, data = 'message', []
+        for line in response:
+            if not self.subscribers:
+                return
+            line = line.decode().rstrip('\r\n')
+            if line.startswith('event:'):
+                event = line[len('event:'):].strip()
+            elif line.startswith('data:'):
+                data.append(line[len('data:'):].strip())
+            elif not line and data:
+                self.publish(event, json.loads('\n'.join(data)))
+                event, data = 'message', []
+
+
+live_feed = LiveFeed()
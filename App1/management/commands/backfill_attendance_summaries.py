@@ -0,0 +1,21 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from App1.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the daily department and monthly student attendance summaries from the "
+            "Attendance table (all of it, or the whole months touching a date range).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=datetime.date.fromisoformat, default=None,
+                            help="First date to rebuild, YYYY-MM-DD (default: the earliest record)")
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=None,
+                            help="Last date to rebuild, YYYY-MM-DD (default: the latest record)")
+
+    def handle(self, *args, **options):
+        daily, monthly = rebuild_summaries(options['start_date'], options['end_date'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {daily} daily department summaries and {monthly} monthly student summaries."))
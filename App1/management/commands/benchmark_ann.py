@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from App1.recognition import match_faces
+from App1.recognition.ann_index import IVFIndex
+
+
+class Command(BaseCommand):
+    help = "Compare exact gallery search with the IVF index on a synthetic gallery (recall@1 and latency)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gallery', type=int, default=50000,
+                            help="Number of enrolled identities (default: 50000)")
+        parser.add_argument('--queries', type=int, default=200,
+                            help="Number of probe faces (default: 200)")
+        parser.add_argument('--batch', type=int, default=40,
+                            help="Faces searched together, as in one frame (default: 40)")
+        parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16, 32],
+                            help="nprobe values to benchmark (default: 1 4 8 16 32)")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        size, dim = options['gallery'], 512
+
+        # Identities are drawn around a few thousand centres, like real embeddings that cluster
+        # by age, gender and pose; probes are noisy re-captures of random identities.
+        centres = rng.standard_normal((max(1, size // 20), dim)).astype(np.float32)
+        gallery = centres[rng.integers(0, len(centres), size)] + \
+            0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+        gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+        truth = rng.integers(0, size, options['queries'])
+        queries = gallery[truth] + 0.02 * rng.standard_normal((len(truth), dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        batches = [queries[i:i + options['batch']] for i in range(0, len(queries), options['batch'])]
+
+        start = time.perf_counter()
+        exact = np.concatenate([match_faces(gallery, batch)[0][:, 0] for batch in batches])
+        exact_ms = (time.perf_counter() - start) * 1000 / len(batches)
+        self.stdout.write(f"{size} identities, {len(queries)} queries in batches of {options['batch']}")
+        self.stdout.write(f"exact search        {exact_ms:8.2f} ms/batch  recall@1 1.000")
+
+        start = time.perf_counter()
+        face_index = IVFIndex.train(gallery, np.arange(size))
+        self.stdout.write(
+            f"trained {len(face_index.centroids)} clusters in {time.perf_counter() - start:.1f} s")
+
+        for nprobe in options['nprobe']:
+            start = time.perf_counter()
+            found = np.concatenate([face_index.search(batch, nprobe)[0][:, 0] for batch in batches])
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(batches)
+            recall = float(np.mean(found == exact))
+            self.stdout.write(
+                f"ivf nprobe={nprobe:<4}     {elapsed_ms:8.2f} ms/batch  recall@1 {recall:.3f}"
+                f"  speed-up {exact_ms / elapsed_ms:5.1f}x")
@@ -0,0 +1,111 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from App1.models import Attendance, Student_Registration
+
+
+class Command(BaseCommand):
+    help = ("Time the attendance hot queries on a synthetic year of attendance, with and without "
+            "the attendance indexes. Runs in a throwaway test database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000,
+                            help="Number of students (default: 5000)")
+        parser.add_argument('--days', type=int, default=365,
+                            help="Days of attendance history (default: 365)")
+        parser.add_argument('--presence', type=float, default=0.9,
+                            help="Fraction of students present each day (default: 0.9)")
+        parser.add_argument('--lookups', type=int, default=2000,
+                            help="Per-student attendance lookups timed (default: 2000)")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.populate(options)
+            with_indexes = self.run_queries(options)
+            self.drop_indexes()
+            without_indexes = self.run_queries(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f"{'query':<40}{'no indexes':>14}{'indexes':>14}{'speed-up':>10}")
+        for label, indexed_ms in with_indexes.items():
+            plain_ms = without_indexes[label]
+            self.stdout.write(
+                f"{label:<40}{plain_ms:>11.3f} ms{indexed_ms:>11.3f} ms{plain_ms / indexed_ms:>9.1f}x")
+
+    def populate(self, options):
+        rng = random.Random(0)
+        start = time.perf_counter()
+        Student_Registration.objects.bulk_create([
+            Student_Registration(
+                stu_id=f'S{i:06d}', name=f'Student {i}', email=f'student{i}@example.com',
+                phone_number='0', designation='Student', department=f'Dept {i % 20}',
+                profile_image=f'student_images/S{i:06d}.jpg', is_active=rng.random() < 0.95)
+            for i in range(options['students'])], batch_size=1000)
+        student_ids = list(Student_Registration.objects.values_list('pk', flat=True))
+
+        today = timezone.localdate()
+        for offset in range(options['days']):
+            day = today - datetime.timedelta(days=offset)
+            check_in = timezone.make_aware(datetime.datetime.combine(day, datetime.time(9)))
+            Attendance.objects.bulk_create([
+                Attendance(student_registration_id=student_id, date=day, check_in_time=check_in,
+                           check_out_time=check_in + datetime.timedelta(hours=6))
+                for student_id in student_ids if rng.random() < options['presence']], batch_size=5000)
+        self.stdout.write(
+            f"{len(student_ids)} students, {Attendance.objects.count()} attendance rows "
+            f"generated in {time.perf_counter() - start:.1f} s")
+
+    def run_queries(self, options):
+        rng = random.Random(1)
+        today = timezone.localdate()
+        student_ids = list(Student_Registration.objects.values_list('pk', flat=True))
+        report_days = [today - datetime.timedelta(days=rng.randrange(options['days'])) for _ in range(20)]
+        lookups = [rng.choice(student_ids) for _ in range(options['lookups'])]
+
+        timings = {}
+
+        # Recognition path: today's row of one student (the old get_or_create lookup)
+        start = time.perf_counter()
+        for student_id in lookups:
+            Attendance.objects.filter(student_registration_id=student_id, date=today).first()
+        timings['recognition: row of student for today'] = \
+            (time.perf_counter() - start) * 1000 / len(lookups)
+
+        # Attendance writer start-up: every row of today
+        start = time.perf_counter()
+        for _ in range(5):
+            list(Attendance.objects.filter(date=today))
+        timings['writer warm-up: all rows of today'] = (time.perf_counter() - start) * 1000 / 5
+
+        # Report view: one day of attendance with the student of each row
+        start = time.perf_counter()
+        for day in report_days:
+            list(Attendance.objects.filter(date=day).select_related('student_registration'))
+        timings['report: one date with students'] = (time.perf_counter() - start) * 1000 / len(report_days)
+
+        # Student list: deauthorized students awaiting approval
+        start = time.perf_counter()
+        for _ in range(20):
+            list(Student_Registration.objects.filter(is_active=False).values_list('pk', flat=True))
+        timings['students: is_active=False'] = (time.perf_counter() - start) * 1000 / 20
+        return timings
+
+    def drop_indexes(self):
+        with connection.schema_editor() as schema_editor:
+            for constraint in Attendance._meta.constraints:
+                schema_editor.remove_constraint(Attendance, constraint)
+            for index in Attendance._meta.indexes:
+                schema_editor.remove_index(Attendance, index)
+            is_active = Student_Registration._meta.get_field('is_active')
+            unindexed = is_active.clone()
+            unindexed.db_index = False
+            unindexed.set_attributes_from_name('is_active')
+            unindexed.model = Student_Registration
+            schema_editor.alter_field(Student_Registration, is_active, unindexed)
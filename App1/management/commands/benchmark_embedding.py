@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import torch
+from django.core.management.base import BaseCommand
+
+from App1.models import CameraConfiguration
+from App1.recognition import get_engine
+from App1.recognition.loaders import get_resnet
+
+
+class Command(BaseCommand):
+    help = ("Compare per-face InceptionResnetV1 calls with the batched embedding path of a face "
+            "engine on CPU, in faces/s and faces/s per core.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faces', type=int, default=40,
+                            help="Number of face crops per frame (default: 40)")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Number of timed runs per method (default: 5)")
+        parser.add_argument('--batch-size', type=int, nargs='+', default=[8, 16, 32],
+                            help="Batch sizes to benchmark (default: 8 16 32)")
+        parser.add_argument('--engine', default=CameraConfiguration.FACENET,
+                            choices=[value for value, _ in CameraConfiguration.ENGINE_CHOICES],
+                            help="Face engine whose batched path is timed (default: facenet)")
+        parser.add_argument('--threads', type=int, nargs='+', default=None,
+                            help="torch intra-op thread counts to benchmark (default: current setting)")
+
+    # The loop detect_and_encode used before batching: one forward pass per face
+    def embed_one_by_one(self, face_crops):
+        resnet = get_resnet()
+        embeddings = []
+        with torch.no_grad():
+            for face in face_crops:
+                face = np.transpose(face, (2, 0, 1)).astype(np.float32) / 255.0
+                face_tensor = torch.tensor(face).unsqueeze(0)
+                embeddings.append(resnet(face_tensor).detach().numpy().flatten())
+        return np.array(embeddings)
+
+    def time_runs(self, func, repeat):
+        func()  # warm-up run
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - start) / repeat, result
+
+    def handle(self, *args, **options):
+        faces, repeat = options['faces'], options['repeat']
+        engine = get_engine(options['engine'])
+        engine.load()
+        rng = np.random.default_rng(0)
+        face_crops = [rng.integers(0, 256, (160, 160, 3), dtype=np.uint8)
+                      for _ in range(faces)]
+
+        if engine.name == CameraConfiguration.ONNX and options['threads']:
+            self.stdout.write(self.style.WARNING(
+                "--threads sets torch threads; ONNX Runtime picks its own, so per-core figures "
+                "of the batched path are only indicative"))
+
+        for threads in options['threads'] or [torch.get_num_threads()]:
+            torch.set_num_threads(threads)
+            self.stdout.write(
+                f"{faces} faces, {repeat} runs, engine: {engine.name}, torch threads: {threads}")
+
+            baseline, expected = self.time_runs(
+                lambda: self.embed_one_by_one(face_crops), repeat)
+            self.stdout.write(
+                f"per-face loop      {baseline * 1000:8.1f} ms/frame  {faces / baseline:7.1f} faces/s"
+                f"  {faces / baseline / threads:7.1f} faces/s/core")
+
+            for batch_size in options['batch_size']:
+                elapsed, result = self.time_runs(
+                    lambda: engine.embed(face_crops, batch_size=batch_size), repeat)
+                max_diff = float(np.abs(result - expected).max())
+                self.stdout.write(
+                    f"batch size {batch_size:<7} {elapsed * 1000:8.1f} ms/frame  {faces / elapsed:7.1f} faces/s"
+                    f"  {faces / elapsed / threads:7.1f} faces/s/core"
+                    f"  speed-up {baseline / elapsed:4.2f}x  max diff {max_diff:.2e}")
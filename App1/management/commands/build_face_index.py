@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from App1.recognition import build_known_faces
+from App1.recognition.ann_index import IVFIndex, index_lock
+
+
+class Command(BaseCommand):
+    help = "Retrain the approximate nearest-neighbour index from all stored face embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nlist', type=int, default=None,
+                            help="Number of k-means clusters (default: 4 * sqrt(gallery size))")
+
+    def handle(self, *args, **options):
+        # Registrations wait while the index is rebuilt, so none is lost between reading and saving
+        with index_lock(settings.FACE_INDEX_DIR):
+            known_faces = build_known_faces()
+            if not len(known_faces):
+                self.stdout.write(self.style.WARNING("No face embeddings to index."))
+                return
+
+            face_index = IVFIndex.train(
+                known_faces.encodings, known_faces.student_ids, nlist=options['nlist'])
+            face_index.save(settings.FACE_INDEX_DIR)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(face_index)} students in {len(face_index.centroids)} clusters "
+            f"at {settings.FACE_INDEX_DIR}"))
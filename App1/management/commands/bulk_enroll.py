@@ -0,0 +1,187 @@
+import csv
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from App1.bulk_enrolment import ImageSource, detect_face, init_worker
+from App1.models import FaceEmbedding, Student_Registration
+from App1.recognition import add_to_face_index, get_engine, invalidate_known_faces
+
+REQUIRED_COLUMNS = ('stu_id', 'name', 'email')
+
+
+class Command(BaseCommand):
+    help = ("Enroll students from a CSV (stu_id, name, email, phone_number, designation, department, "
+            "image) and a directory or zip of profile images. Faces are detected in a process pool "
+            "and embedded in batches; students are written in chunks, one transaction each. "
+            "Rerunning the command skips students already enrolled, so an interrupted run resumes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help="CSV with one student per row")
+        parser.add_argument('--images', required=True,
+                            help="Directory or zip of images; a row's image column names its file, "
+                                 "otherwise <stu_id>.jpg (or .jpeg, .png, ...) is used")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Face detection processes (default: number of CPUs)")
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help="Students written per transaction (default: 200)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Faces per embedding forward pass (default: FACE_EMBED_BATCH_SIZE)")
+        parser.add_argument('--rejects', default=None,
+                            help="CSV report of rejected rows (default: <csv_file>.rejects.csv)")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['images']):
+            raise CommandError(f"Image directory or zip not found: {options['images']}")
+        self.images = ImageSource(options['images'])
+        self.batch_size = options['batch_size']
+        self.rejects = []       # (row number, stu_id, reason)
+        self.enrolled = []      # (student pk, embedding)
+        rejects_path = options['rejects'] or f"{options['csv_file']}.rejects.csv"
+
+        rows, skipped = self.read_rows(options['csv_file'])
+        self.stdout.write(f"{len(rows) + skipped + len(self.rejects)} rows: {len(rows)} to enroll, "
+                          f"{skipped} already enrolled, {len(self.rejects)} rejected before detection")
+
+        start = time.perf_counter()
+        try:
+            if rows:
+                self.enroll(rows, options)
+        finally:
+            # Whatever was committed is in the gallery, even if the run was interrupted. A student
+            # with only a profile embedding has that (L2-normalized) embedding as centroid.
+            if self.enrolled:
+                centroids = np.vstack([embedding for _, embedding in self.enrolled])
+                centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+                add_to_face_index([pk for pk, _ in self.enrolled], centroids)
+                invalidate_known_faces()
+            self.write_rejects(rejects_path)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Enrolled {len(self.enrolled)} students in {elapsed:.1f} s, {len(self.rejects)} rejected"))
+        if self.rejects:
+            self.stdout.write(f"Rejected rows are listed in {rejects_path}")
+
+    def reject(self, row_number, stu_id, reason):
+        self.rejects.append((row_number, stu_id, reason))
+
+    # Validate the CSV against itself and the database before any image is decoded
+    def read_rows(self, csv_file):
+        with open(csv_file, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise CommandError(f"CSV is missing the column(s): {', '.join(missing)}")
+            rows = [(row_number, {key: (value or '').strip() for key, value in row.items() if key})
+                    for row_number, row in enumerate(reader, start=2)]    # row 1 is the header
+
+        existing = dict(Student_Registration.objects.values_list('stu_id', 'email'))
+        enrolled = set(FaceEmbedding.objects.filter(source=FaceEmbedding.PROFILE).values_list(
+            'student_registration__stu_id', flat=True))
+        existing_emails = {email.lower() for email in existing.values()}
+
+        accepted, skipped = [], 0
+        seen_ids, seen_emails = set(), set()
+        for row_number, row in rows:
+            stu_id, email = row.get('stu_id', ''), row.get('email', '')
+            empty = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+            if empty:
+                self.reject(row_number, stu_id, f"missing {', '.join(empty)}")
+            elif stu_id in seen_ids:
+                self.reject(row_number, stu_id, 'duplicate stu_id in CSV')
+            elif email.lower() in seen_emails:
+                self.reject(row_number, stu_id, 'duplicate email in CSV')
+            elif stu_id in existing:
+                if existing[stu_id].lower() == email.lower() and stu_id in enrolled:
+                    skipped += 1    # enrolled by an earlier run
+                else:
+                    self.reject(row_number, stu_id, 'duplicate stu_id')
+            elif email.lower() in existing_emails:
+                self.reject(row_number, stu_id, 'duplicate email')
+            else:
+                image_name = self.images.find(row.get('image'), stu_id)
+                if image_name is None:
+                    self.reject(row_number, stu_id, 'image not found')
+                else:
+                    row['image'] = image_name
+                    accepted.append((row_number, row))
+            seen_ids.add(stu_id)
+            seen_emails.add(email.lower())
+        return accepted, skipped
+
+    def enroll(self, rows, options):
+        rows_by_number = dict(rows)
+        chunk = []
+        # Create the pool before the embedder loads, so forked workers do not inherit torch threads
+        with multiprocessing.Pool(options['workers'], initializer=init_worker,
+                                  initargs=(options['images'],)) as pool:
+            engine = get_engine()
+            results = pool.imap(detect_face, [(row_number, row['image']) for row_number, row in rows],
+                                chunksize=8)
+            for row_number, crop, probability, reason in results:
+                row = rows_by_number[row_number]
+                if reason:
+                    self.reject(row_number, row['stu_id'], reason)
+                    continue
+                chunk.append((row_number, row, crop, probability))
+                if len(chunk) >= options['chunk_size']:
+                    self.write_chunk(engine, chunk)
+                    chunk = []
+            if chunk:
+                self.write_chunk(engine, chunk)
+
+    # Embed a chunk of faces in batches and store the students with their embeddings atomically
+    def write_chunk(self, engine, chunk):
+        embeddings = engine.embed([crop for _, _, crop, _ in chunk], batch_size=self.batch_size)
+        image_names = []
+        students = []
+        for row_number, row, crop, probability in chunk:
+            extension = os.path.splitext(row['image'])[1].lower()
+            image_names.append(default_storage.save(
+                f"student_images/{row['stu_id']}{extension}", ContentFile(self.images.read(row['image']))))
+            students.append(Student_Registration(
+                stu_id=row['stu_id'], name=row['name'], email=row['email'],
+                phone_number=row.get('phone_number', ''), designation=row.get('designation', ''),
+                department=row.get('department', ''), profile_image=image_names[-1], is_active=True))
+
+        try:
+            with transaction.atomic():
+                self.store(students, chunk, embeddings)
+            self.enrolled.extend(zip([student.pk for student in students], embeddings))
+        except IntegrityError:
+            # Someone registered one of these students meanwhile; store the rest one by one
+            for student, item, embedding in zip(students, chunk, embeddings):
+                student.pk = None
+                student._state.adding = True
+                try:
+                    with transaction.atomic():
+                        self.store([student], [item], embedding[None])
+                    self.enrolled.append((student.pk, embedding))
+                except IntegrityError:
+                    default_storage.delete(student.profile_image.name)
+                    self.reject(item[0], student.stu_id, 'duplicate stu_id or email')
+        self.stdout.write(f"  {len(self.enrolled)} enrolled, {len(self.rejects)} rejected")
+
+    def store(self, students, chunk, embeddings):
+        Student_Registration.objects.bulk_create(students)
+        FaceEmbedding.objects.bulk_create([
+            FaceEmbedding(student_registration=student,
+                          embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+                          source=FaceEmbedding.PROFILE, source_image=student.profile_image.name,
+                          quality=probability)
+            for student, (_, _, _, probability), embedding in zip(students, chunk, embeddings)])
+
+    def write_rejects(self, path):
+        if not self.rejects:
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['row', 'stu_id', 'reason'])
+            writer.writerows(sorted(self.rejects))
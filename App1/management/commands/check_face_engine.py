@@ -0,0 +1,79 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from App1.models import CameraConfiguration
+from App1.recognition import get_engine, match_faces
+from App1.recognition.optimize import profile_face_crops
+
+
+class Command(BaseCommand):
+    help = ("Accuracy regression check of a face engine against the float facenet model: compare "
+            "embeddings and match decisions on the enrolled profile faces.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', default=CameraConfiguration.TORCHSCRIPT_INT8,
+                            choices=[value for value, _ in CameraConfiguration.ENGINE_CHOICES],
+                            help="Face engine to check (default: torchscript_int8)")
+        parser.add_argument('--threshold', type=float, default=0.6,
+                            help="Match distance threshold (default: 0.6, the camera default)")
+        parser.add_argument('--limit', type=int, default=1000,
+                            help="Maximum number of enrolled students checked (default: 1000)")
+        parser.add_argument('--min-agreement', type=float, default=0.99,
+                            help="Fail when fewer match decisions agree (default: 0.99)")
+
+    # Euclidean distance of every (query, gallery) pair via one matrix product
+    def pair_distances(self, queries, gallery):
+        squared = (np.einsum('ij,ij->i', queries, queries)[:, None]
+                   + np.einsum('ij,ij->i', gallery, gallery)[None, :] - 2.0 * (queries @ gallery.T))
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        student_ids, face_crops = profile_face_crops(limit=options['limit'])
+        if len(face_crops) < 2:
+            raise CommandError("Need at least two enrolled students with a detectable profile face")
+        reference = get_engine(CameraConfiguration.FACENET)
+        candidate = get_engine(options['engine'])
+        candidate.load()
+
+        # The gallery is what enrolment stores: float embeddings of the profile faces. Queries
+        # are the mirrored faces, a second view of each student that is not an exact gallery copy.
+        gallery = reference.embed(face_crops)
+        queries = [np.ascontiguousarray(crop[:, ::-1]) for crop in face_crops]
+        expected = reference.embed(queries)
+        result = candidate.embed(queries)
+
+        cosine = np.einsum('ij,ij->i', expected, result) / (
+            np.linalg.norm(expected, axis=1) * np.linalg.norm(result, axis=1))
+        self.stdout.write(
+            f"{len(face_crops)} enrolled faces, engine {candidate.name} vs {reference.name}")
+        self.stdout.write(
+            f"embedding cosine similarity  min {cosine.min():.5f}  mean {cosine.mean():.5f}")
+        self.stdout.write(
+            f"embedding max abs difference {np.abs(expected - result).max():.2e}")
+
+        # Recognizer decision: nearest gallery student if within the threshold, else unknown
+        expected_indices, expected_distances = match_faces(gallery, expected)
+        result_indices, result_distances = match_faces(gallery, result)
+        student_ids = np.asarray(student_ids)
+        expected_ids = np.where(expected_distances[:, 0] < threshold, student_ids[expected_indices[:, 0]], -1)
+        result_ids = np.where(result_distances[:, 0] < threshold, student_ids[result_indices[:, 0]], -1)
+        identity_agreement = float(np.mean(expected_ids == result_ids))
+        self.stdout.write(
+            f"top-1 decisions agree        {identity_agreement:.2%} "
+            f"({int(np.sum(expected_ids != result_ids))} differ)")
+
+        # Verification decision for every (query, gallery face) pair, the stricter check
+        expected_pairs = self.pair_distances(expected, gallery) < threshold
+        result_pairs = self.pair_distances(result, gallery) < threshold
+        pair_agreement = float(np.mean(expected_pairs == result_pairs))
+        self.stdout.write(
+            f"pair decisions agree         {pair_agreement:.4%} "
+            f"({int(np.sum(expected_pairs != result_pairs))} of {expected_pairs.size} pairs differ)")
+        self.stdout.write(
+            f"distance shift               max {np.abs(expected_distances - result_distances).max():.4f}")
+
+        if min(identity_agreement, pair_agreement) < options['min_agreement']:
+            raise CommandError(
+                f"Match decisions of {candidate.name} agree below {options['min_agreement']:.2%}")
+        self.stdout.write(self.style.SUCCESS(f"{candidate.name} matches the float model"))
@@ -0,0 +1,83 @@
+import os
+import time
+
+import numpy as np
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from App1.recognition.loaders import get_onnx_session, get_resnet, get_torchscript_resnet
+from App1.recognition.optimize import (NO_QUANTIZATION, QUANTIZATION_CHOICES, STATIC,
+                                       face_batches, optimize_embedder, profile_face_crops)
+
+
+class Command(BaseCommand):
+    help = ("Export the vggface2 InceptionResnetV1 embedder for the torchscript, torchscript_int8 "
+            "or onnx face engine and check its embeddings against the eager model.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['torchscript', 'onnx'], default='torchscript',
+                            help="Export format (default: torchscript)")
+        parser.add_argument('--quantize', choices=QUANTIZATION_CHOICES, default=NO_QUANTIZATION,
+                            help="int8 quantization of the TorchScript export: dynamic (linear layers) "
+                                 "or static (convolutions too, calibrated on enrolled faces)")
+        parser.add_argument('--channels-last', action='store_true',
+                            help="Run the TorchScript export on channels-last memory")
+        parser.add_argument('--calibration-faces', type=int, default=256,
+                            help="Enrolled profile faces used to calibrate static quantization (default: 256)")
+        parser.add_argument('--output', default=None,
+                            help="Output file (default: FACE_TORCHSCRIPT_MODEL, FACE_TORCHSCRIPT_INT8_MODEL "
+                                 "or FACE_ONNX_MODEL)")
+
+    def handle(self, *args, **options):
+        export_format, quantize = options['format'], options['quantize']
+        if export_format == 'onnx' and (quantize != NO_QUANTIZATION or options['channels_last']):
+            raise CommandError("--quantize and --channels-last only apply to --format torchscript")
+        if options['output']:
+            output = options['output']
+        elif export_format == 'onnx':
+            output = settings.FACE_ONNX_MODEL
+        elif quantize != NO_QUANTIZATION:
+            output = settings.FACE_TORCHSCRIPT_INT8_MODEL
+        else:
+            output = settings.FACE_TORCHSCRIPT_MODEL
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+        calibration_batches = None
+        if quantize == STATIC:
+            _, face_crops = profile_face_crops(limit=options['calibration_faces'])
+            if not face_crops:
+                raise CommandError("Static quantization is calibrated on enrolled profile faces; "
+                                   "register students first or use --quantize dynamic")
+            self.stdout.write(f"Calibrating on {len(face_crops)} enrolled faces")
+            calibration_batches = face_batches(face_crops)
+
+        resnet = get_resnet()
+        start = time.perf_counter()
+        if export_format == 'torchscript':
+            optimize_embedder(resnet, quantize, options['channels_last'], calibration_batches).save(output)
+        else:
+            with torch.no_grad():
+                torch.onnx.export(
+                    resnet, torch.rand(4, 3, 160, 160), output,
+                    input_names=['faces'], output_names=['embeddings'],
+                    dynamic_axes={'faces': {0: 'batch'}, 'embeddings': {0: 'batch'}}, dynamo=False)
+        self.stdout.write(f"Exported {export_format} embedder to {output} "
+                          f"in {time.perf_counter() - start:.1f} s")
+
+        # The engines batch a variable number of faces, so check a different batch size too
+        faces = torch.rand(7, 3, 160, 160)
+        with torch.no_grad():
+            expected = resnet(faces).numpy()
+        if export_format == 'torchscript':
+            with torch.inference_mode():
+                result = get_torchscript_resnet(output)(faces).numpy()
+        else:
+            result = get_onnx_session(output).run(None, {'faces': faces.numpy()})[0]
+        max_diff = float(np.abs(result - expected).max())
+        tolerance = 1e-4 if quantize == NO_QUANTIZATION else 1e-2
+        style = self.style.SUCCESS if max_diff < tolerance else self.style.WARNING
+        self.stdout.write(style(f"Max embedding difference from the eager model: {max_diff:.2e}"))
+        if quantize != NO_QUANTIZATION:
+            self.stdout.write("Check match decisions on the gallery with "
+                              "`python manage.py check_face_engine --engine torchscript_int8`")
@@ -0,0 +1,30 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from App1.recognizer import RecognizerService
+
+
+class Command(BaseCommand):
+    help = "Run the face recognition camera pipelines as a long-lived, supervised process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds between start/stop checks and status updates "
+                                 "(default: RECOGNIZER_POLL_INTERVAL)")
+
+    def handle(self, *args, **options):
+        service = RecognizerService(poll_interval=options['poll_interval'])
+
+        # Stop cleanly on Ctrl+C or a service manager's SIGTERM
+        def request_stop(signum, frame):
+            self.stdout.write("Stopping recognizer...")
+            service.stop()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        self.stdout.write(self.style.SUCCESS(
+            "Recognizer running. Start cameras from the web app or the admin panel."))
+        service.run()
+        self.stdout.write("Recognizer stopped.")
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 11:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0004_student_registration_registration_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('embedding', models.BinaryField(help_text='Face embedding stored as raw float32 bytes')),
+                ('source_image', models.CharField(help_text='Profile image the embedding was computed from', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student_registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='face_embeddings', to='App1.student_registration')),
+            ],
+        ),
+    ]
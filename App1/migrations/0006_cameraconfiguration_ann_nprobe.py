@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0005_faceembedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='ann_nprobe',
+            field=models.PositiveIntegerField(default=0, help_text='Index clusters searched per face (0 for exact search; higher is more accurate but slower)'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0006_cameraconfiguration_ann_nprobe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faceembedding',
+            name='quality',
+            field=models.FloatField(default=0.0, help_text='Face detection probability of the embedded crop'),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='source',
+            field=models.CharField(choices=[('profile', 'Profile image'), ('capture', 'Registration capture'), ('live', 'Live recognition')], default='profile', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='faceembedding',
+            name='source_image',
+            field=models.CharField(blank=True, help_text='Profile image the embedding was computed from', max_length=255),
+        ),
+    ]
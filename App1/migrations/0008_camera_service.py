@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0007_faceembedding_source_quality'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='is_enabled',
+            field=models.BooleanField(default=False, help_text='Run this camera in the recognizer service'),
+        ),
+        migrations.CreateModel(
+            name='CameraStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('stopped', 'Stopped'), ('running', 'Running'), ('restarting', 'Restarting')], default='stopped', max_length=20)),
+                ('message', models.TextField(blank=True)),
+                ('last_heartbeat', models.DateTimeField(blank=True, null=True)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('camera', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='status', to='App1.cameraconfiguration')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0008_camera_service'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='frame_skip',
+            field=models.PositiveIntegerField(default=0, help_text='Captured frames skipped between recognized frames'),
+        ),
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='target_fps',
+            field=models.FloatField(default=0, help_text='Frames per second sent to recognition (0 for as many as inference can take)'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 11:50
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_attendance(apps, schema_editor):
+    """Collapse duplicate (student, date) rows into one before the unique constraint is added.
+
+    The kept row gets the earliest check-in and the latest check-out of its duplicates.
+    """
+    Attendance = apps.get_model('App1', 'Attendance')
+    duplicates = (Attendance.objects.values('student_registration', 'date')
+                  .annotate(rows=Count('id')).filter(rows__gt=1))
+    for duplicate in duplicates:
+        rows = list(Attendance.objects.filter(
+            student_registration=duplicate['student_registration'],
+            date=duplicate['date']).order_by('id'))
+        kept = rows[0]
+        check_ins = [row.check_in_time for row in rows if row.check_in_time]
+        check_outs = [row.check_out_time for row in rows if row.check_out_time]
+        kept.check_in_time = min(check_ins) if check_ins else None
+        kept.check_out_time = max(check_outs) if check_outs else None
+        kept.save()
+        Attendance.objects.filter(pk__in=[row.pk for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0009_cameraconfiguration_frame_rate'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_attendance, migrations.RunPython.noop),
+    ]
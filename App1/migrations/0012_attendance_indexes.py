@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # Duplicate (student, date) rows are merged by the previous migration. The data change
+        # has to be committed before this one alters the table; PostgreSQL refuses to mix them.
+        ('App1', '0011_merge_duplicate_attendance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student_registration',
+            name='is_active',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student_registration', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 11:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0012_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDepartmentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('department', models.CharField(max_length=100)),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('checked_out_count', models.PositiveIntegerField(default=0)),
+                ('total_stay_seconds', models.FloatField(default=0.0, help_text='Summed check-in to check-out time of the checked-out students')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'department'), name='unique_daily_department_summary')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyStudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('days_present', models.PositiveIntegerField(default=0)),
+                ('days_checked_out', models.PositiveIntegerField(default=0)),
+                ('total_stay_seconds', models.FloatField(default=0.0)),
+                ('student_registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='App1.student_registration')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student_registration', 'month'), name='unique_monthly_student_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0013_attendance_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='engine',
+            field=models.CharField(choices=[('facenet', 'facenet_pytorch (CPU)'), ('torchscript', 'TorchScript export'), ('onnx', 'ONNX Runtime export')], default='facenet', help_text="Inference backend used for this camera's faces", max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0014_cameraconfiguration_engine'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cameraconfiguration',
+            name='engine',
+            field=models.CharField(choices=[('facenet', 'facenet_pytorch (CPU)'), ('torchscript', 'TorchScript export'), ('torchscript_int8', 'TorchScript int8 export'), ('onnx', 'ONNX Runtime export')], default='facenet', help_text="Inference backend used for this camera's faces", max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0015_cameraconfiguration_engine_int8'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faceembedding',
+            name='face_image',
+            field=models.ImageField(blank=True, help_text='Face crop the embedding was computed from', upload_to='face_crops/'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App1', '0016_faceembedding_face_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='detection_scale',
+            field=models.FloatField(default=1.0, help_text='Frame scale used for face detection (0.5 halves width and height; 1 for full resolution)'),
+        ),
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='min_face_size',
+            field=models.PositiveIntegerField(default=20, help_text='Smallest face detected, in full-resolution pixels'),
+        ),
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='onet_threshold',
+            field=models.FloatField(default=0.7, help_text='MTCNN O-Net (final face) threshold'),
+        ),
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='pnet_threshold',
+            field=models.FloatField(default=0.6, help_text='MTCNN P-Net (face proposal) threshold'),
+        ),
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='rnet_threshold',
+            field=models.FloatField(default=0.7, help_text='MTCNN R-Net (refinement) threshold'),
+        ),
+        migrations.AddField(
+            model_name='cameraconfiguration',
+            name='roi',
+            field=models.JSONField(blank=True, default=list, help_text='Region of interest polygon as [[x, y], ...] fractions of the frame (empty for the whole frame)'),
+        ),
+    ]
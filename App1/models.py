@@ -1,9 +1,19 @@
 from django.db import models
 
+# import numpy for converting stored embeddings back into vectors
+import numpy as np
+
 # import timezone for handling date and time fields
 from django.utils import timezone
 
 
+# function to format a check-in to check-out timedelta as hours, minutes, seconds
+def format_duration(duration):
+    hours, remainder = divmod(duration.total_seconds(), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
+
+
 # model for student registration
 class Student_Registration(models.Model):
     stu_id = models.CharField(
@@ -14,13 +24,48 @@ class Student_Registration(models.Model):
     designation = models.CharField(max_length=100)
     department = models.CharField(max_length=100)
     profile_image = models.ImageField(upload_to='student_images/')
-    is_active = models.BooleanField(default=True)
+    is_active = models.BooleanField(default=True, db_index=True)
     registration_date = models.DateTimeField(auto_now_add=True)
 
     # string representation of the model instance
     def __str__(self):
         return f"{self.name} ({self.stu_id})"
 
+# model for storing precomputed face embeddings of students
+
+
+class FaceEmbedding(models.Model):
+    PROFILE = 'profile'
+    CAPTURE = 'capture'
+    LIVE = 'live'
+    SOURCE_CHOICES = [
+        (PROFILE, 'Profile image'),
+        (CAPTURE, 'Registration capture'),
+        (LIVE, 'Live recognition'),
+    ]
+
+    student_registration = models.ForeignKey(
+        Student_Registration, on_delete=models.CASCADE, related_name='face_embeddings')
+    embedding = models.BinaryField(
+        help_text="Face embedding stored as raw float32 bytes")
+    source = models.CharField(
+        max_length=10, choices=SOURCE_CHOICES, default=PROFILE)
+    source_image = models.CharField(
+        max_length=255, blank=True, help_text="Profile image the embedding was computed from")
+    quality = models.FloatField(
+        default=0.0, help_text="Face detection probability of the embedded crop")
+    face_image = models.ImageField(
+        upload_to='face_crops/', blank=True, help_text="Face crop the embedding was computed from")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Embedding of {self.student_registration.name}"
+
+    # method to convert the stored bytes back into a numpy vector
+    def to_vector(self):
+        """Return the embedding as a float32 numpy array."""
+        return np.frombuffer(self.embedding, dtype=np.float32)
+
 # model for attendance records
 
 
@@ -31,6 +76,16 @@ class Attendance(models.Model):
     check_in_time = models.DateTimeField(null=True, blank=True)
     check_out_time = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        # one attendance row per student per day; also the index for the per-student lookup
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_registration', 'date'], name='unique_attendance_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='attendance_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student_registration.name} - {self.date}"
 
@@ -58,12 +113,8 @@ class Attendance(models.Model):
         if self.check_in_time and self.check_out_time:
             duration = self.check_out_time - self.check_in_time
 
-            # format duration as hours, minutes, seconds
-            hours, remainder = divmod(duration.total_seconds(), 3600)
-            minutes, seconds = divmod(remainder, 60)
-
             # return formatted duration string
-            return f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
+            return format_duration(duration)
         return "Not yet calculated"
 
     # override save method to set date automatically at creation
@@ -72,17 +123,130 @@ class Attendance(models.Model):
             self.date = timezone.now().date()
         super().save(*args, **kwargs)  # call the real save() method
 
+# model for the attendance summary of one department on one day, kept up to date by the
+# recognizer's attendance writer and rebuilt by `manage.py backfill_attendance_summaries`
+
+
+class DailyDepartmentSummary(models.Model):
+    date = models.DateField()
+    department = models.CharField(max_length=100)
+    present_count = models.PositiveIntegerField(default=0)
+    checked_out_count = models.PositiveIntegerField(default=0)
+    total_stay_seconds = models.FloatField(
+        default=0.0, help_text="Summed check-in to check-out time of the checked-out students")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'department'], name='unique_daily_department_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.department} - {self.date}"
+
+    # method to get the average stay of the checked-out students in seconds
+    def average_stay_seconds(self):
+        return self.total_stay_seconds / self.checked_out_count if self.checked_out_count else None
+
+# model for the attendance summary of one student in one month (month is its first day)
+
+
+class MonthlyStudentSummary(models.Model):
+    student_registration = models.ForeignKey(
+        Student_Registration, on_delete=models.CASCADE, related_name='monthly_summaries')
+    month = models.DateField()
+    days_present = models.PositiveIntegerField(default=0)
+    days_checked_out = models.PositiveIntegerField(default=0)
+    total_stay_seconds = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_registration', 'month'], name='unique_monthly_student_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_registration.name} - {self.month:%Y-%m}"
+
+    # method to get the average stay per checked-out day in seconds
+    def average_stay_seconds(self):
+        return self.total_stay_seconds / self.days_checked_out if self.days_checked_out else None
+
 # model for camera configuration
 
 
 class CameraConfiguration(models.Model):
+    FACENET = 'facenet'
+    TORCHSCRIPT = 'torchscript'
+    TORCHSCRIPT_INT8 = 'torchscript_int8'
+    ONNX = 'onnx'
+    ENGINE_CHOICES = [
+        (FACENET, 'facenet_pytorch (CPU)'),
+        (TORCHSCRIPT, 'TorchScript export'),
+        (TORCHSCRIPT_INT8, 'TorchScript int8 export'),
+        (ONNX, 'ONNX Runtime export'),
+    ]
+
     name = models.CharField(max_length=100, unique=True,
                             help_text="Give a name to this camera configuration")
     camera_source = models.CharField(
         max_length=255, help_text="Camera index (0 for default webcam or RTSP/HTTP URL for IP camera)")
     threshold = models.FloatField(
         default=0.6, help_text="Face recognition confidence threshold")
+    ann_nprobe = models.PositiveIntegerField(
+        default=0, help_text="Index clusters searched per face (0 for exact search; higher is more accurate but slower)")
+    target_fps = models.FloatField(
+        default=0, help_text="Frames per second sent to recognition (0 for as many as inference can take)")
+    frame_skip = models.PositiveIntegerField(
+        default=0, help_text="Captured frames skipped between recognized frames")
+    engine = models.CharField(
+        max_length=20, choices=ENGINE_CHOICES, default=FACENET,
+        help_text="Inference backend used for this camera's faces")
+    detection_scale = models.FloatField(
+        default=1.0, help_text="Frame scale used for face detection (0.5 halves width and height; 1 for full resolution)")
+    min_face_size = models.PositiveIntegerField(
+        default=20, help_text="Smallest face detected, in full-resolution pixels")
+    roi = models.JSONField(
+        default=list, blank=True,
+        help_text="Region of interest polygon as [[x, y], ...] fractions of the frame (empty for the whole frame)")
+    pnet_threshold = models.FloatField(
+        default=0.6, help_text="MTCNN P-Net (face proposal) threshold")
+    rnet_threshold = models.FloatField(
+        default=0.7, help_text="MTCNN R-Net (refinement) threshold")
+    onet_threshold = models.FloatField(
+        default=0.7, help_text="MTCNN O-Net (final face) threshold")
+    is_enabled = models.BooleanField(
+        default=False, help_text="Run this camera in the recognizer service")
 
     # string representation of the model instance
     def __str__(self):
         return self.name
+
+# model for the live status of a camera, written by the recognizer service
+
+
+class CameraStatus(models.Model):
+    STOPPED = 'stopped'
+    RUNNING = 'running'
+    RESTARTING = 'restarting'
+    STATE_CHOICES = [
+        (STOPPED, 'Stopped'),
+        (RUNNING, 'Running'),
+        (RESTARTING, 'Restarting'),
+    ]
+
+    camera = models.OneToOneField(
+        CameraConfiguration, on_delete=models.CASCADE, related_name='status')
+    state = models.CharField(
+        max_length=20, choices=STATE_CHOICES, default=STOPPED)
+    message = models.TextField(blank=True)
+    last_heartbeat = models.DateTimeField(null=True, blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"{self.camera.name} - {self.state}"
+
+    # method to tell whether the recognizer service reported recently
+    def is_alive(self, max_age=10):
+        """Return True if the recognizer service reported within max_age seconds."""
+        return bool(self.last_heartbeat) and (timezone.now() - self.last_heartbeat).total_seconds() <= max_age
@@ -0,0 +1,9 @@
+# Face recognition engine: detection, embedding and matching, kept apart from the HTTP views.
+# FaceEngine backends (facenet, torchscript, torchscript_int8, onnx) are chosen per
+# CameraConfiguration.engine; enrolment uses settings.FACE_ENGINE.
+from .engine import FULL_FRAME, DetectedFace, DetectionOptions, FaceEngine, crop_face, get_engine
+from .gallery import (KnownFaces, add_to_face_index, build_known_faces, claim_live_embedding, detect_enrolment_face,
+                      encode_captures, encode_student, find_duplicate_students, invalidate_known_faces,
+                      load_face_index, load_known_faces, recognize_faces, release_live_embedding,
+                      store_embedding, store_live_embeddings, update_face_index)
+from .matching import FaceMatch, match_faces
@@ -0,0 +1,227 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# Function to compute squared Euclidean distances between two sets of vectors
+def squared_distances(queries, vectors):
+    query_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+    vector_norms = np.einsum('ij,ij->i', vectors, vectors)[None, :]
+    return np.maximum(query_norms + vector_norms - 2.0 * (queries @ vectors.T), 0.0)
+
+
+# Function to find the nearest centroid of every vector, chunked to bound memory
+def nearest_centroids(vectors, centroids, chunk_size=8192):
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmin(
+            squared_distances(chunk, centroids), axis=1)
+    return assignments
+
+
+class IVFIndex:
+    """Inverted-file (IVF) index over face embeddings.
+
+    Vectors are bucketed by their nearest k-means centroid. A search scans only the
+    buckets of the ``nprobe`` centroids closest to each query, so ``nprobe`` trades
+    recall for latency. Ids are the primary keys of the indexed students.
+    """
+
+    FILES = ('centroids', 'vectors', 'ids', 'assignments')
+
+    def __init__(self, centroids, vectors=None, ids=None, assignments=None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        dim = self.centroids.shape[1]
+        self.vectors = vectors if vectors is not None else np.empty((0, dim), dtype=np.float32)
+        self.ids = ids if ids is not None else np.empty(0, dtype=np.int64)
+        self.assignments = assignments if assignments is not None else np.empty(0, dtype=np.int32)
+        self._build_lists()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Group row numbers by centroid so each bucket can be scanned directly
+    def _build_lists(self):
+        order = np.argsort(self.assignments, kind='stable')
+        bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    @classmethod
+    def train(cls, vectors, ids, nlist=None, iterations=10, sample_size=20000, seed=0):
+        """Run k-means on (a sample of) the vectors and index all of them."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if nlist is None:
+            nlist = int(4 * np.sqrt(len(vectors)))
+        nlist = max(1, min(nlist, len(vectors)))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = nearest_centroids(sample, centroids)
+            counts = np.bincount(assignments, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            filled = counts > 0     # empty clusters keep their previous centroid
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        index = cls(centroids)
+        index.add(ids, vectors)
+        return index
+
+    def add(self, ids, vectors):
+        """Add vectors under the given ids, assigning each to its nearest centroid."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.assignments = np.concatenate(
+            [self.assignments, nearest_centroids(vectors, self.centroids)])
+        self._build_lists()
+
+    def remove(self, ids):
+        """Drop every vector stored under the given ids."""
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        if keep.all():
+            return
+        self.vectors = self.vectors[keep]
+        self.ids = self.ids[keep]
+        self.assignments = self.assignments[keep]
+        self._build_lists()
+
+    def search(self, queries, nprobe=8, top_k=1):
+        """Return (ids, distances) of shape (M, top_k); missing neighbours have id -1."""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        nprobe = max(1, min(nprobe, len(self.centroids)))
+        result_ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        result_distances = np.full((len(queries), top_k), np.inf, dtype=np.float32)
+
+        centroid_distances = squared_distances(queries, self.centroids)
+        probes = np.argpartition(centroid_distances, nprobe - 1, axis=1)[:, :nprobe]
+
+        # Scan the union of probed buckets with one matrix product for the whole batch,
+        # masking out rows whose bucket was not probed by a given query
+        probed = np.zeros((len(queries), len(self.centroids)), dtype=bool)
+        np.put_along_axis(probed, probes, True, axis=1)
+        rows = np.concatenate([self.lists[c] for c in np.flatnonzero(probed.any(axis=0))])
+        if len(rows) == 0:
+            return result_ids, result_distances
+
+        distances = squared_distances(queries, self.vectors[rows])
+        distances[~probed[:, self.assignments[rows]]] = np.inf
+
+        k = min(top_k, len(rows))
+        best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        best_distances = np.take_along_axis(distances, best, axis=1)
+        order = np.argsort(best_distances, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+
+        found = np.isfinite(best_distances)
+        result_ids[:, :k] = np.where(found, self.ids[rows[best]], -1)
+        result_distances[:, :k] = np.sqrt(best_distances)
+        return result_ids, result_distances
+
+    def save(self, directory):
+        """Write the index as .npy files into a new version directory and switch readers to it at once.
+
+        Readers follow the CURRENT pointer file, which is replaced atomically, so they see either
+        the previous index or this one, never a mix. Hold index_lock() around load-modify-save.
+        """
+        os.makedirs(directory, exist_ok=True)
+        version = f'v{time.time_ns()}-{os.getpid()}'
+        os.makedirs(os.path.join(directory, version))
+        for name in self.FILES:
+            np.save(os.path.join(directory, version, f'{name}.npy'),
+                    np.ascontiguousarray(getattr(self, name)))
+
+        previous = read_current_version(directory)
+        temp_path = os.path.join(directory, f'{CURRENT_FILE}.{version}.tmp')
+        with open(temp_path, 'w') as pointer_file:
+            pointer_file.write(version)
+        os.replace(temp_path, os.path.join(directory, CURRENT_FILE))
+
+        # Keep the previous version for readers that read the pointer just before the switch;
+        # older ones go (on Windows a version still memory-mapped stays until a later save)
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if os.path.isdir(path) and entry.startswith('v') and entry not in (version, previous):
+                shutil.rmtree(path, ignore_errors=True)
+            elif entry.endswith('.npy') and previous is None:
+                try:
+                    os.remove(path)     # files of an index saved before versioning
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, directory, attempts=3):
+        """Load the current index, memory-mapping the stored vectors. Returns None if absent."""
+        for attempt in range(attempts):
+            # Indexes saved before versioning sit directly in the directory
+            version = read_current_version(directory)
+            paths = {name: os.path.join(directory, version or '', f'{name}.npy') for name in cls.FILES}
+            if not all(os.path.exists(path) for path in paths.values()):
+                if version is None:
+                    return None
+                continue    # removed by two saves since the pointer was read; read it again
+            try:
+                return cls(
+                    np.load(paths['centroids']),
+                    vectors=np.load(paths['vectors'], mmap_mode='r'),
+                    ids=np.load(paths['ids']),
+                    assignments=np.load(paths['assignments']),
+                )
+            except FileNotFoundError:
+                continue
+        return None
+
+
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = 'write.lock'
+
+
+# Function to read the name of the index version readers should use, or None before the first save
+def read_current_version(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as pointer_file:
+            return pointer_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# Function to check whether an index has been saved, without loading it
+def index_exists(directory):
+    return (read_current_version(directory) is not None
+            or os.path.exists(os.path.join(directory, 'centroids.npy')))     # saved before versioning
+
+
+# Serialize index writers across threads and processes (web workers, recognizer, bulk_enroll)
+@contextmanager
+def index_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a+b') as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass    # LK_LOCK gives up after about 10 seconds; keep waiting
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,75 @@
+# Embedding backends for FaceEngine. Each runs the same vggface2 InceptionResnetV1, so they
+# can be mixed across cameras without re-enrolling anyone; exported backends only differ in
+# how fast they run on CPU (the int8 export also slightly in precision). Export the model
+# with `python manage.py export_face_embedder`.
+import numpy as np
+from django.conf import settings
+
+from ..models import CameraConfiguration
+from .engine import FaceEngine
+from .loaders import get_onnx_session, get_resnet, get_torchscript_resnet
+
+
+class FacenetEngine(FaceEngine):
+    """facenet_pytorch InceptionResnetV1 run eagerly with torch on CPU."""
+
+    name = CameraConfiguration.FACENET
+
+    def load(self):
+        super().load()
+        get_resnet()
+
+    def forward(self, batch):
+        import torch
+
+        with torch.no_grad():  # disable gradient calculation for inference
+            return get_resnet()(torch.from_numpy(batch)).numpy()
+
+
+class TorchScriptEngine(FaceEngine):
+    """Frozen TorchScript export of the embedder (FACE_TORCHSCRIPT_MODEL), run without Python overhead."""
+
+    name = CameraConfiguration.TORCHSCRIPT
+    model_setting = 'FACE_TORCHSCRIPT_MODEL'
+    export_args = '--format torchscript'
+
+    def model(self):
+        return get_torchscript_resnet(getattr(settings, self.model_setting), self.export_args)
+
+    def load(self):
+        super().load()
+        self.model()
+
+    def forward(self, batch):
+        import torch
+
+        model = self.model()
+        with torch.inference_mode():
+            return model(torch.from_numpy(batch)).numpy()
+
+
+class TorchScriptInt8Engine(TorchScriptEngine):
+    """int8-quantized TorchScript export (FACE_TORCHSCRIPT_INT8_MODEL); check it with check_face_engine."""
+
+    name = CameraConfiguration.TORCHSCRIPT_INT8
+    model_setting = 'FACE_TORCHSCRIPT_INT8_MODEL'
+    export_args = '--format torchscript --quantize static'
+
+
+class OnnxEngine(FaceEngine):
+    """ONNX export of the embedder (FACE_ONNX_MODEL) run with ONNX Runtime (optional dependency)."""
+
+    name = CameraConfiguration.ONNX
+
+    def load(self):
+        super().load()
+        get_onnx_session(settings.FACE_ONNX_MODEL)
+
+    def forward(self, batch):
+        session = get_onnx_session(settings.FACE_ONNX_MODEL)
+        input_name = session.get_inputs()[0].name
+        return session.run(None, {input_name: np.ascontiguousarray(batch)})[0]
+
+
+# Backend name (CameraConfiguration.engine) -> engine class
+ENGINES = {engine.name: engine for engine in (FacenetEngine, TorchScriptEngine, TorchScriptInt8Engine, OnnxEngine)}
@@ -0,0 +1,209 @@
+import threading
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from .loaders import get_mtcnn
+
+
+# Structured result for a single face found in an image
+@dataclass
+class DetectedFace:
+    box: np.ndarray         # (x1, y1, x2, y2) in image pixels
+    probability: float      # MTCNN detection probability
+    landmarks: np.ndarray   # (5, 2) eye, nose and mouth-corner points
+    embedding: np.ndarray   # (512,) float32 InceptionResnetV1 embedding, None until encoded
+
+
+# Where and at what resolution faces are searched for in a camera's frames
+@dataclass(frozen=True)
+class DetectionOptions:
+    scale: float = 1.0                      # detection image scale, 1 for full resolution
+    min_face_size: int = 20                 # smallest face, in full-resolution pixels
+    thresholds: tuple = (0.6, 0.7, 0.7)     # MTCNN P-Net, R-Net and O-Net thresholds
+    roi: tuple = ()                         # region of interest polygon, (x, y) fractions of the frame
+
+    @classmethod
+    def for_camera(cls, cam_config):
+        scale = cam_config.detection_scale
+        return cls(
+            scale=scale if 0 < scale < 1 else 1.0,
+            min_face_size=cam_config.min_face_size or 20,
+            thresholds=(cam_config.pnet_threshold, cam_config.rnet_threshold, cam_config.onet_threshold),
+            roi=tuple(tuple(point) for point in cam_config.roi or ()),
+        )
+
+    # Function to get the ROI polygon in pixels of a width x height frame, or None for the whole frame
+    def roi_polygon(self, width, height):
+        if len(self.roi) < 3:
+            return None
+        return np.array([(x * width, y * height) for x, y in self.roi], dtype=np.float32)
+
+    def prepare(self, image):
+        """Cut the ROI's bounding box out of an image and scale it down for detection.
+
+        Returns (detection image, (x offset, y offset, x scale, y scale), ROI polygon in image pixels or None).
+        """
+        height, width = image.shape[:2]
+        polygon = self.roi_polygon(width, height)
+        x1, y1, x2, y2 = 0, 0, width, height
+        if polygon is not None:
+            x1, y1 = np.floor(polygon.min(axis=0)).astype(int).clip(0, [width - 1, height - 1])
+            x2, y2 = np.ceil(polygon.max(axis=0)).astype(int)
+            x2, y2 = min(max(x2, x1 + 1), width), min(max(y2, y1 + 1), height)
+            image = image[y1:y2, x1:x2]
+        if self.scale < 1:
+            size = (max(round((x2 - x1) * self.scale), 1), max(round((y2 - y1) * self.scale), 1))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        return image, (x1, y1, image.shape[1] / (x2 - x1), image.shape[0] / (y2 - y1)), polygon
+
+    # MTCNN settings in detection image pixels; PNet looks at 12 pixel windows, and a smaller
+    # minimum would make MTCNN upsample the frame that was just scaled down
+    def mtcnn_settings(self):
+        return max(round(self.min_face_size * self.scale), 12), tuple(self.thresholds)
+
+
+FULL_FRAME = DetectionOptions()
+
+
+# Function to crop a detected face box out of the image and resize it for the embedder
+def crop_face(image, box):
+    height, width = image.shape[:2]
+    # Clamp the box to the image so negative coordinates do not wrap around
+    x1, y1 = max(int(box[0]), 0), max(int(box[1]), 0)
+    x2, y2 = min(int(box[2]), width), min(int(box[3]), height)
+    face = image[y1:y2, x1:x2]   # Crop the face
+    if face.size == 0:
+        return None
+    return cv2.resize(face, (160, 160))         # Resize to 160*160
+
+
+class FaceEngine:
+    """Detect, embed and match faces.
+
+    Every engine detects with the shared MTCNN and matches against the shared gallery;
+    backends differ in how the InceptionResnetV1 embedder is run (see forward()). All
+    backends run the same vggface2 weights, so their embeddings share one gallery.
+    """
+
+    name = None
+
+    # Run the embedder on a (B, 3, 160, 160) float32 batch in [0, 1]; returns (B, 512)
+    def forward(self, batch):
+        raise NotImplementedError
+
+    # Load the models now instead of on the first face
+    def load(self):
+        get_mtcnn()
+
+    def detect(self, images, options=None):
+        """Return one list of DetectedFace per RGB image, with embedding left as None.
+
+        options holds one DetectionOptions per image (default: the whole image at full resolution).
+        Faces are searched in the scaled-down region of interest, but boxes and landmarks are
+        returned in image pixels so crops for the embedder are cut at full resolution.
+        """
+        if options is None:
+            options = [FULL_FRAME] * len(images)
+        prepared = [option.prepare(image) for image, option in zip(images, options)]
+        detections = [None] * len(images)
+
+        # MTCNN can only batch images of the same size and settings, so group frames by both
+        groups = {}
+        for position, (detection_image, transform, polygon) in enumerate(prepared):
+            groups.setdefault((detection_image.shape, options[position].mtcnn_settings()), []).append(position)
+        for (shape, (min_face_size, thresholds)), positions in groups.items():
+            mtcnn = get_mtcnn(min_face_size, thresholds)
+            if len(positions) == 1:
+                boxes, probs, landmarks = mtcnn.detect(
+                    prepared[positions[0]][0], landmarks=True)
+                results = [(boxes, probs, landmarks)]
+            else:
+                results = zip(*mtcnn.detect([prepared[p][0] for p in positions], landmarks=True))
+            for position, result in zip(positions, results):
+                detections[position] = result
+
+        results = [[] for _ in images]
+        for position, (boxes, probs, landmarks) in enumerate(detections):
+            if boxes is None:
+                continue
+            detection_image, (x_offset, y_offset, x_scale, y_scale), polygon = prepared[position]
+            # Map back from the detection image to the full-resolution image
+            boxes = (np.asarray(boxes, dtype=np.float32) / [x_scale, y_scale, x_scale, y_scale]
+                     + [x_offset, y_offset, x_offset, y_offset]).astype(np.float32)
+            landmarks = (np.asarray(landmarks, dtype=np.float32) / [x_scale, y_scale]
+                         + [x_offset, y_offset]).astype(np.float32)
+            for box, prob, points in zip(boxes, probs, landmarks):
+                center = (float(box[0] + box[2]) / 2, float(box[1] + box[3]) / 2)
+                if polygon is not None and cv2.pointPolygonTest(polygon, center, False) < 0:
+                    continue    # inside the ROI's bounding box but outside the polygon
+                results[position].append(DetectedFace(
+                    box=box, probability=float(prob), landmarks=points, embedding=None))
+        return results
+
+    def embed(self, face_crops, batch_size=None):
+        """Embed a list of 160x160 RGB crops (from one or several frames) into an (N, 512) array."""
+        if batch_size is None:
+            batch_size = settings.FACE_EMBED_BATCH_SIZE
+        if len(face_crops) == 0:
+            return np.empty((0, 512), dtype=np.float32)
+
+        faces = np.stack(face_crops)    # (N, 160, 160, 3) uint8
+        embeddings = []
+        for start in range(0, len(faces), batch_size):
+            # (B, 160, 160, 3) uint8 -> (B, 3, 160, 160) float32 in [0, 1]
+            batch = faces[start:start + batch_size].transpose(0, 3, 1, 2).astype(np.float32)
+            batch /= 255.0
+            embeddings.append(np.asarray(self.forward(batch), dtype=np.float32))
+        return np.concatenate(embeddings)
+
+    def encode(self, images, faces):
+        """Fill in face.embedding for each (image position, DetectedFace) pair.
+
+        Returns the faces that were embedded; faces whose box falls outside the image are skipped.
+        """
+        kept_faces = []
+        face_crops = []
+        for position, face in faces:
+            crop = crop_face(images[position], face.box)
+            if crop is None:
+                continue    # keep results aligned with the crops that were actually embedded
+            kept_faces.append(face)
+            face_crops.append(crop)
+
+        # One batched forward pass for the faces of every frame
+        for face, embedding in zip(kept_faces, self.embed(face_crops)):
+            face.embedding = embedding
+        return kept_faces
+
+    def detect_and_encode(self, images):
+        """Return one list of embedded DetectedFace per image."""
+        detections = self.detect(images)
+        self.encode(images, [(position, face) for position, faces in enumerate(detections)
+                             for face in faces])
+        return [[face for face in faces if face.embedding is not None] for faces in detections]
+
+    def match(self, known_faces, encodings, threshold=0.6, top_k=1, nprobe=0):
+        """Return, per encoding, up to top_k FaceMatch candidates below the threshold."""
+        from .gallery import recognize_faces
+        return recognize_faces(known_faces, encodings, threshold, top_k, nprobe)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+# Function to get the shared engine for a backend name (default: FACE_ENGINE)
+def get_engine(name=None):
+    from .backends import ENGINES
+
+    name = name or settings.FACE_ENGINE
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            if name not in ENGINES:
+                raise ValueError(f"Unknown face engine {name!r}; choose from {', '.join(ENGINES)}")
+            engine = _engines[name] = ENGINES[name]()
+        return engine
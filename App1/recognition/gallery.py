@@ -0,0 +1,397 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from ..models import FaceEmbedding, Student_Registration
+from .ann_index import IVFIndex, index_exists, index_lock
+from .engine import crop_face, get_engine
+from .matching import FaceMatch, match_faces
+
+
+# ============================================= Shared store of known face embeddings ==================================
+# Embeddings are computed once per student and persisted in FaceEmbedding. Every camera
+# thread shares one read-only float32 matrix built from those rows; it is rebuilt only
+# after invalidate_known_faces() is called by the views that change the enrolled set.
+# Large galleries are also searched through an IVF index persisted in FACE_INDEX_DIR.
+_known_faces = None
+_face_index = None
+_known_faces_version = None
+_known_faces_lock = threading.Lock()
+
+
+# Function to persist one detected face as an embedding of a student, with the crop it came from
+def store_embedding(student, face, source, source_image='', crop=None):
+    face_embedding = FaceEmbedding(
+        student_registration=student,
+        embedding=np.asarray(face.embedding, dtype=np.float32).tobytes(),
+        source=source,
+        source_image=source_image,
+        quality=face.probability,
+    )
+    if crop is not None:
+        ret, jpeg = cv2.imencode('.jpg', cv2.cvtColor(crop, cv2.COLOR_RGB2BGR))
+        if ret:
+            face_embedding.face_image.save(
+                f"{student.stu_id}_{source}.jpg", ContentFile(jpeg.tobytes()), save=False)
+    try:
+        face_embedding.save()
+    except Exception:
+        if face_embedding.face_image:
+            face_embedding.face_image.delete(save=False)     # no row points at the crop
+        raise
+    return face_embedding
+
+
+# Function to find the one face of an enrolment capture, before anything is saved
+def detect_enrolment_face(image):
+    """Detect and embed the single face of an RGB image.
+
+    Returns (DetectedFace, 160x160 RGB crop, None), or (None, None, reason) when the image
+    has no face or more than one, so a bad capture is rejected instead of enrolled.
+    """
+    engine = get_engine()
+    faces = engine.detect([image])[0]
+    if not faces:
+        return None, None, 'no face found'
+    if len(faces) > 1:
+        return None, None, f'{len(faces)} faces found'
+    crop = crop_face(image, faces[0].box)
+    if crop is None:
+        return None, None, 'face outside the image'
+    faces[0].embedding = engine.embed([crop])[0]
+    return faces[0], crop, None
+
+
+# Function to find enrolled students that look like a new student, i.e. a likely duplicate enrolment
+def find_duplicate_students(embeddings, threshold=None, top_k=3):
+    """Return FaceMatch candidates for the centroid of a new student's embeddings, closest first.
+
+    Runs inside the registration request, so it only reads stored embeddings: unlike
+    load_known_faces() it never encodes a profile image, and students without a stored
+    embedding are skipped.
+    """
+    if threshold is None:
+        threshold = settings.FACE_DUPLICATE_DISTANCE
+    # Compare the way recognition will: the student's L2-normalized centroid against theirs
+    centroid = np.vstack(embeddings).mean(axis=0)
+    centroid = (centroid / np.linalg.norm(centroid)).astype(np.float32)
+
+    student_ids, centroids = stored_centroids()
+    if not student_ids:
+        return []
+    indices, distances = match_faces(centroids, centroid[None], top_k)
+    matches = [(student_ids[index], float(distance))
+               for index, distance in zip(indices[0], distances[0]) if distance < threshold]
+
+    students = Student_Registration.objects.in_bulk([student_id for student_id, _ in matches])
+    return [FaceMatch(student_id, students[student_id].stu_id, students[student_id].name, distance)
+            for student_id, distance in matches if student_id in students]
+
+
+# Function to get active students' centroids from their stored embeddings alone
+def stored_centroids(student_ids=None):
+    """Return (student ids, (N, 512) float32 L2-normalized centroids) of the active students.
+
+    Never encodes anything; the rows are summed per student while streaming them, so memory
+    stays one vector per student.
+    """
+    rows = FaceEmbedding.objects.filter(student_registration__is_active=True)
+    if student_ids is not None:
+        rows = rows.filter(student_registration_id__in=list(student_ids))
+    sums = {}
+    for student_id, embedding in rows.values_list('student_registration_id', 'embedding').iterator(chunk_size=2000):
+        vector = np.frombuffer(embedding, dtype=np.float32)
+        if student_id in sums:
+            sums[student_id] += vector
+        else:
+            sums[student_id] = vector.copy()
+    if not sums:
+        return [], np.empty((0, 512), dtype=np.float32)
+
+    ids = list(sums)
+    centroids = np.vstack([sums[student_id] for student_id in ids])
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    return ids, centroids
+
+
+# Function to compute and persist the embedding of a student's profile image
+def encode_student(student):
+    """Encode the student's profile image and store the embedding. Returns True on success."""
+    FaceEmbedding.objects.filter(
+        student_registration=student, source=FaceEmbedding.PROFILE).delete()
+
+    known_image = cv2.imread(student.profile_image.path)
+    if known_image is None:
+        print(f"Unable to read profile image for {student}")
+        return False
+
+    known_image_rgb = cv2.cvtColor(known_image, cv2.COLOR_BGR2RGB)
+    detected_faces = get_engine().detect_and_encode([known_image_rgb])[0]
+    if not detected_faces:
+        print(f"No face found in profile image for {student}")
+        return False
+
+    # A profile image belongs to a single student, so keep the first (largest) face only
+    store_embedding(student, detected_faces[0], FaceEmbedding.PROFILE,
+                    source_image=student.profile_image.name)
+    return True
+
+
+# Function to add embeddings from extra registration captures taken at other angles
+def encode_captures(student, images):
+    """Store one embedding per RGB image that contains a face. Returns the number stored."""
+    stored = 0
+    for image in images:
+        detected_faces = get_engine().detect_and_encode([image])[0]
+        if detected_faces:
+            store_embedding(student, detected_faces[0], FaceEmbedding.CAPTURE)
+            stored += 1
+    return stored
+
+
+# Read-only gallery of known faces; row i of encodings is the centroid of student_ids[i]
+@dataclass
+class KnownFaces:
+    encodings: np.ndarray   # (N, 512) float32, one L2-normalized centroid per student
+    names: list             # display only; students are identified by student_ids
+    student_ids: list       # Student_Registration primary keys
+    stu_ids: list
+    live_counts: dict = field(default_factory=dict)  # stored live embeddings per student
+
+    def __post_init__(self):
+        self.rows = {student_id: row for row,
+                     student_id in enumerate(self.student_ids)}
+        self.live_captured = set()  # students given a live embedding since this gallery was built
+
+    def __len__(self):
+        return len(self.student_ids)
+
+
+# Function to get a student's identity vector: the centroid of all their stored embeddings
+def student_centroid(student, embeddings):
+    profile = [e for e in embeddings if e.source == FaceEmbedding.PROFILE]
+    if not profile or profile[0].source_image != student.profile_image.name:
+        # Encode students enrolled before the store existed or whose image changed
+        encode_student(student)
+        embeddings = list(FaceEmbedding.objects.filter(
+            student_registration=student))
+    if not embeddings:
+        return None
+
+    centroid = np.vstack([e.to_vector() for e in embeddings]).mean(axis=0)
+    return centroid / np.linalg.norm(centroid)
+
+
+# Function to build the known face matrix from the stored embeddings
+def build_known_faces():
+    known_face_encodings = []
+    known_face_names = []
+    known_face_ids = []
+    known_face_stu_ids = []
+    live_counts = {}
+
+    # Fetch only authorized students together with their stored embeddings
+    students = Student_Registration.objects.filter(
+        is_active=True).prefetch_related('face_embeddings')
+
+    for student in students:
+        embeddings = list(student.face_embeddings.all())
+        centroid = student_centroid(student, embeddings)
+        if centroid is None:
+            continue
+        known_face_encodings.append(centroid)
+        known_face_names.append(student.name)
+        known_face_ids.append(student.pk)
+        known_face_stu_ids.append(student.stu_id)
+        live_counts[student.pk] = sum(
+            e.source == FaceEmbedding.LIVE for e in embeddings)
+
+    if known_face_encodings:
+        matrix = np.vstack(known_face_encodings).astype(np.float32, copy=False)
+    else:
+        matrix = np.empty((0, 512), dtype=np.float32)
+    matrix.flags.writeable = False  # shared between camera threads
+    return KnownFaces(matrix, known_face_names, known_face_ids, known_face_stu_ids, live_counts)
+
+
+# Function to reserve a live capture of the recognized student; nothing is written here
+def claim_live_embedding(known_faces, student_id, face, distance):
+    """Return True if the face should be kept as a live embedding of the student.
+
+    At most one live embedding per student per gallery build, up to FACE_MAX_LIVE_EMBEDDINGS.
+    Called by the inference workers; the claimed faces are written by store_live_embeddings().
+    """
+    if face.probability < settings.FACE_LIVE_CAPTURE_PROBABILITY or distance > settings.FACE_LIVE_CAPTURE_DISTANCE:
+        return False
+
+    with _known_faces_lock:
+        if (student_id in known_faces.live_captured
+                or known_faces.live_counts.get(student_id, 0) >= settings.FACE_MAX_LIVE_EMBEDDINGS):
+            return False
+        known_faces.live_captured.add(student_id)
+        known_faces.live_counts[student_id] = known_faces.live_counts.get(
+            student_id, 0) + 1
+    return True
+
+
+# Function to give a claim back when its embedding could not be stored, so a later capture can retry
+def release_live_embedding(known_faces, student_id):
+    with _known_faces_lock:
+        known_faces.live_captured.discard(student_id)
+        known_faces.live_counts[student_id] = max(known_faces.live_counts.get(student_id, 1) - 1, 0)
+
+
+# Function to store claimed live captures as extra embeddings of the recognized students
+def store_live_embeddings(known_faces, captures):
+    """Store (student_id, DetectedFace) pairs claimed from known_faces. Returns the student ids stored.
+
+    Each capture is written on its own, so one that fails (e.g. its student was deleted after
+    the gallery was built) is skipped and released without losing the others.
+    """
+    stored = []
+    for student_id, face in captures:
+        try:
+            # The new embedding moves the student's centroid the next time the gallery is rebuilt
+            store_embedding(Student_Registration(pk=student_id), face, FaceEmbedding.LIVE)
+        except Exception as e:
+            print(f"Error storing live embedding for student {student_id}: {e}")
+            release_live_embedding(known_faces, student_id)
+            continue
+        stored.append(student_id)
+    # Keep the persisted index at the centroids the next gallery build will compute
+    refresh_face_index(stored)
+    return stored
+
+
+# Function to read the gallery version that invalidate_known_faces() bumps in any process
+def known_faces_version():
+    try:
+        return os.stat(settings.FACE_GALLERY_VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+# Function to get the shared known face matrix, loading it on first use
+def load_known_faces():
+    global _known_faces, _face_index, _known_faces_version
+    # The web process invalidates the gallery while the recognizer service reads it
+    version = known_faces_version()
+    with _known_faces_lock:
+        if version != _known_faces_version:
+            _known_faces = None
+            _face_index = None
+            _known_faces_version = version
+        if _known_faces is None:
+            _known_faces = build_known_faces()
+        return _known_faces
+
+
+# Function to get the approximate nearest-neighbour index, building it for large galleries
+def load_face_index():
+    global _face_index
+    known_faces = load_known_faces()
+    with _known_faces_lock:
+        if _face_index is None:
+            _face_index = IVFIndex.load(settings.FACE_INDEX_DIR)
+        if _face_index is None and len(known_faces) >= settings.FACE_INDEX_MIN_GALLERY:
+            with index_lock(settings.FACE_INDEX_DIR):
+                # Another process may have saved one while this one waited for the lock
+                _face_index = IVFIndex.load(settings.FACE_INDEX_DIR)
+                if _face_index is None:
+                    _face_index = IVFIndex.train(
+                        known_faces.encodings, known_faces.student_ids)
+                    _face_index.save(settings.FACE_INDEX_DIR)
+        return _face_index
+
+
+# Function to add, refresh or remove one student in the persisted index after an enrolment change
+def update_face_index(student, deleted=False):
+    if not index_exists(settings.FACE_INDEX_DIR):
+        return  # no index yet; it is trained from the gallery once it is large enough
+
+    centroid = None
+    if not deleted and student.is_active:
+        centroid = student_centroid(
+            student, list(FaceEmbedding.objects.filter(student_registration=student)))
+
+    # Load, change and save under the writers' lock so concurrent enrolments keep each other's changes
+    with index_lock(settings.FACE_INDEX_DIR):
+        face_index = IVFIndex.load(settings.FACE_INDEX_DIR)
+        if face_index is None:
+            return
+        face_index.remove([student.pk])
+        if centroid is not None:
+            face_index.add([student.pk], centroid)
+        face_index.save(settings.FACE_INDEX_DIR)
+
+
+# Function to add many newly enrolled students to the persisted index with a single write
+def add_to_face_index(student_ids, centroids):
+    if not len(student_ids):
+        return
+    with index_lock(settings.FACE_INDEX_DIR):
+        face_index = IVFIndex.load(settings.FACE_INDEX_DIR)
+        if face_index is None:
+            return
+        face_index.remove(student_ids)
+        face_index.add(student_ids, centroids)
+        face_index.save(settings.FACE_INDEX_DIR)
+
+
+# Function to move students' index entries to the centroids of their stored embeddings
+def refresh_face_index(student_ids):
+    if not student_ids or not index_exists(settings.FACE_INDEX_DIR):
+        return
+    try:
+        add_to_face_index(*stored_centroids(student_ids))
+    except Exception as e:
+        # The entries catch up on the student's next change or the next build_face_index
+        print(f"Error refreshing the face index: {e}")
+
+
+# Function to drop the shared matrix and index so they are reloaded on next use, in every process
+def invalidate_known_faces():
+    global _known_faces, _face_index
+    with _known_faces_lock:
+        _known_faces = None
+        _face_index = None
+
+    os.makedirs(os.path.dirname(
+        settings.FACE_GALLERY_VERSION_FILE), exist_ok=True)
+    with open(settings.FACE_GALLERY_VERSION_FILE, 'w') as version_file:
+        version_file.write(str(time.time_ns()))
+
+
+# Function to recognize faces
+# Adjust threshold as needed; nprobe > 0 searches the approximate index instead of the full gallery
+def recognize_faces(known_faces, test_encodings, threshold=0.6, top_k=1, nprobe=0):
+    """Return, per test encoding, up to top_k FaceMatch candidates below the threshold, best first."""
+    if len(known_faces) == 0 or len(test_encodings) == 0:
+        return [[] for _ in test_encodings]
+
+    face_index = load_face_index() if nprobe > 0 else None
+    if face_index is not None:
+        student_ids, distances = face_index.search(
+            test_encodings, nprobe, top_k)
+        # Students missing from the gallery (e.g. deauthorized) map to -1 and are skipped
+        indices = [[known_faces.rows.get(student_id, -1) for student_id in row]
+                   for row in student_ids.tolist()]
+    else:
+        indices, distances = match_faces(
+            known_faces.encodings, test_encodings, top_k)
+
+    recognized_candidates = []  # List of candidate lists, best match first
+    for row_indices, row_distances in zip(indices, distances):
+        recognized_candidates.append([
+            FaceMatch(known_faces.student_ids[index], known_faces.stu_ids[index],
+                      known_faces.names[index], float(distance))
+            for index, distance in zip(row_indices, row_distances)
+            if index >= 0 and distance < threshold
+        ])
+    return recognized_candidates
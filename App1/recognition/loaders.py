@@ -0,0 +1,76 @@
+# Lazily loaded face models: MTCNN detection, InceptionResnetV1 embedding and its exported
+# TorchScript (float or int8) / ONNX copies. torch, facenet_pytorch and onnxruntime are only imported when a
+# model is first needed, so manage.py commands, migrations, the admin and web workers that
+# never encode a face do not pay the import time and memory.
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+# Function to build a model once per process, even if several threads ask at the same time
+def get_model(name, build):
+    model = _models.get(name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = build()
+    return model
+
+
+def _build_mtcnn(min_face_size, thresholds):
+    from facenet_pytorch import MTCNN
+    return MTCNN(keep_all=True, min_face_size=min_face_size, thresholds=list(thresholds))
+
+
+def _build_resnet():
+    from facenet_pytorch import InceptionResnetV1
+    # Set to evaluation mode
+    return InceptionResnetV1(pretrained='vggface2').eval()
+
+
+# Function to get the shared MTCNN face detector for a minimum face size and P/R/O-Net thresholds
+def get_mtcnn(min_face_size=20, thresholds=(0.6, 0.7, 0.7)):
+    # Detectors are shared by threads, so each setting gets its own instance instead of a mutated one
+    thresholds = tuple(thresholds)
+    return get_model(f'mtcnn:{min_face_size}:{thresholds}',
+                     lambda: _build_mtcnn(min_face_size, thresholds))
+
+
+# Function to get the shared InceptionResnetV1 face embedder
+def get_resnet():
+    return get_model('resnet', _build_resnet)
+
+
+# Function to check that an exported model file exists before loading it
+def exported_model_path(path, export_args):
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(
+            f"Face embedder export not found at {path}. "
+            f"Create it with `python manage.py export_face_embedder {export_args}`.")
+    return path
+
+
+# Function to get a TorchScript export of the embedder (FACE_TORCHSCRIPT_MODEL or its int8 copy)
+def get_torchscript_resnet(path, export_args='--format torchscript'):
+    def build():
+        import torch
+        return torch.jit.load(exported_model_path(path, export_args), map_location='cpu').eval()
+    return get_model(f'torchscript:{path}', build)
+
+
+# Function to get an ONNX Runtime session for the ONNX export of the embedder (FACE_ONNX_MODEL)
+def get_onnx_session(path):
+    def build():
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImproperlyConfigured(
+                "The onnx face engine needs onnxruntime: pip install onnxruntime")
+        return onnxruntime.InferenceSession(
+            exported_model_path(path, '--format onnx'), providers=['CPUExecutionProvider'])
+    return get_model(f'onnx:{path}', build)
@@ -0,0 +1,47 @@
+from typing import NamedTuple
+
+import numpy as np
+from django.conf import settings
+
+
+# Function to find the k nearest known encodings for every test encoding in one pass
+def match_faces(known_encodings, test_encodings, top_k=1, chunk_size=None):
+    """Return (indices, distances), each of shape (M, k), sorted by Euclidean distance."""
+    if chunk_size is None:
+        chunk_size = settings.FACE_MATCH_CHUNK_SIZE
+    known_encodings = np.asarray(known_encodings, dtype=np.float32)
+    test_encodings = np.asarray(test_encodings, dtype=np.float32).reshape(
+        -1, known_encodings.shape[1])
+    top_k = min(top_k, len(known_encodings))
+
+    best_indices = np.empty((len(test_encodings), 0), dtype=np.int64)
+    best_distances = np.empty((len(test_encodings), 0), dtype=np.float32)
+    test_norms = np.einsum('ij,ij->i', test_encodings, test_encodings)[:, None]
+
+    # Walk the gallery in chunks so temporary memory stays at M x chunk_size floats
+    for start in range(0, len(known_encodings), chunk_size):
+        chunk = known_encodings[start:start + chunk_size]
+        chunk_norms = np.einsum('ij,ij->i', chunk, chunk)[None, :]
+
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b for all pairs with a single matrix product
+        squared = test_norms + chunk_norms - 2.0 * (test_encodings @ chunk.T)
+
+        # Keep the chunk's k best, then merge them with the best found so far
+        k = min(top_k, chunk.shape[0])
+        chunk_best = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        merged_distances = np.hstack(
+            [best_distances, np.take_along_axis(squared, chunk_best, axis=1)])
+        merged_indices = np.hstack([best_indices, chunk_best + start])
+        order = np.argsort(merged_distances, axis=1)[:, :top_k]
+        best_distances = np.take_along_axis(merged_distances, order, axis=1)
+        best_indices = np.take_along_axis(merged_indices, order, axis=1)
+
+    return best_indices, np.sqrt(np.maximum(best_distances, 0.0))
+
+
+# One recognition candidate; the student is identified by primary key, the name is only displayed
+class FaceMatch(NamedTuple):
+    student_id: int
+    stu_id: str
+    name: str
+    distance: float
@@ -0,0 +1,86 @@
+# CPU-optimized exports of the InceptionResnetV1 embedder for the torchscript engines: traced
+# and frozen (BatchNorm folded into the convolutions, weights inlined as constants), optionally
+# channels-last and int8-quantized. Written by `manage.py export_face_embedder` and checked
+# against the float model with `manage.py check_face_engine`.
+import copy
+
+import cv2
+import numpy as np
+import torch
+
+from ..models import CameraConfiguration, Student_Registration
+from .engine import crop_face, get_engine
+
+NO_QUANTIZATION = 'none'
+DYNAMIC = 'dynamic'     # int8 weights for the Linear layers, activations quantized on the fly
+STATIC = 'static'       # int8 convolutions too, with activation ranges calibrated on real faces
+QUANTIZATION_CHOICES = [NO_QUANTIZATION, DYNAMIC, STATIC]
+
+
+class ChannelsLast(torch.nn.Module):
+    """Run the embedder on channels-last (NHWC) memory; the conversion is part of the export."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model.to(memory_format=torch.channels_last)
+
+    def forward(self, faces):
+        return self.model(faces.contiguous(memory_format=torch.channels_last))
+
+
+# Function to turn 160x160 RGB face crops into the (B, 3, 160, 160) float input of the embedder
+def face_batches(face_crops, batch_size=32):
+    faces = np.stack(face_crops).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    return [torch.from_numpy(faces[start:start + batch_size])
+            for start in range(0, len(faces), batch_size)]
+
+
+# Function to crop the face of each enrolled student's profile image
+def profile_face_crops(limit=None):
+    """Return (student ids, 160x160 RGB crops) for the active students whose profile has a face."""
+    engine = get_engine(CameraConfiguration.FACENET)
+    student_ids, face_crops = [], []
+    students = Student_Registration.objects.filter(is_active=True).order_by('pk')
+    for student in students.iterator():
+        if limit and len(face_crops) >= limit:
+            break
+        image = cv2.imread(student.profile_image.path) if student.profile_image else None
+        if image is None:
+            continue
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        faces = engine.detect([image])[0]
+        crop = crop_face(image, faces[0].box) if faces else None
+        if crop is not None:
+            student_ids.append(student.pk)
+            face_crops.append(crop)
+    return student_ids, face_crops
+
+
+# Function to quantize the embedder's convolutions and linear layers to int8
+def quantize_static(model, calibration_batches):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    # Use the kernels of this CPU (x86 / qnnpack on ARM); load the export on the same kind of host
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    prepared = prepare_fx(model, qconfig_mapping, (calibration_batches[0],))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)     # record activation ranges
+    return convert_fx(prepared)
+
+
+# Function to build the traced, frozen embedder written by export_face_embedder
+def optimize_embedder(model, quantize=NO_QUANTIZATION, channels_last=False, calibration_batches=None):
+    model = copy.deepcopy(model).eval()
+    if quantize == DYNAMIC:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif quantize == STATIC:
+        model = quantize_static(model, calibration_batches)
+    if channels_last:
+        model = ChannelsLast(model).eval()
+
+    example = torch.rand(4, 3, 160, 160)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.freeze(traced)
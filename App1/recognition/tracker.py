@@ -0,0 +1,84 @@
+import itertools
+
+import numpy as np
+from django.conf import settings
+
+
+# Function to compute the intersection over union of every pair of (x1, y1, x2, y2) boxes
+def box_iou(boxes_a, boxes_b):
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-6), 0.0)
+
+
+class FaceTrack:
+    """One face followed across frames, with the identity from its last embedding."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, face):
+        self.track_id = next(self._ids)
+        self.face = face
+        self.candidates = None      # recognize_faces() result of the last embedding
+        self.frames_since_embed = 0
+        self.misses = 0             # consecutive frames without a matching detection
+        self.iou = 1.0              # overlap between the last two boxes of this track
+
+    def needs_embedding(self):
+        return (self.candidates is None
+                or self.frames_since_embed >= settings.FACE_TRACK_REEMBED_INTERVAL
+                or self.iou < settings.FACE_TRACK_STABLE_IOU
+                or self.face.probability < settings.FACE_TRACK_MIN_PROBABILITY)
+
+
+class FaceTracker:
+    """Associate the MTCNN boxes of consecutive frames of one camera by IoU.
+
+    A face that stays where it was keeps its track and cached identity, so the embedder
+    only runs for new tracks, every FACE_TRACK_REEMBED_INTERVAL frames, or when the track
+    becomes uncertain (the box moved a lot or the detection probability dropped).
+    """
+
+    def __init__(self):
+        self.tracks = []
+
+    def update(self, faces):
+        """Match this frame's detections to the existing tracks and return one track per face."""
+        matched = [None] * len(faces)
+        taken = set()
+        if self.tracks and faces:
+            ious = box_iou([face.box for face in faces], [track.face.box for track in self.tracks])
+            # Greedy association: best overlapping pair first
+            for face_pos, track_pos in zip(*np.unravel_index(np.argsort(-ious, axis=None), ious.shape)):
+                if ious[face_pos, track_pos] < settings.FACE_TRACK_MIN_IOU:
+                    break
+                if matched[face_pos] is not None or track_pos in taken:
+                    continue
+                track = self.tracks[track_pos]
+                track.iou = float(ious[face_pos, track_pos])
+                matched[face_pos] = track
+                taken.add(track_pos)
+
+        # Forget tracks that have not been seen for a few frames
+        for track_pos, track in enumerate(self.tracks):
+            track.misses = 0 if track_pos in taken else track.misses + 1
+        self.tracks = [track for track in self.tracks if track.misses <= settings.FACE_TRACK_MAX_MISSES]
+
+        for face_pos, face in enumerate(faces):
+            track = matched[face_pos]
+            if track is None:
+                track = FaceTrack(face)
+                self.tracks.append(track)
+            else:
+                track.face = face
+                track.frames_since_embed += 1
+            matched[face_pos] = track
+        return matched
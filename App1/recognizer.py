@@ -0,0 +1,683 @@
+# Long-running recognizer service: runs the camera pipelines outside the HTTP request cycle.
+# Started with `python manage.py run_recognizer`; the web app starts and stops individual
+# cameras through CameraConfiguration.is_enabled and reads back CameraStatus rows.
+#
+# Frames flow through three stages so cameras no longer serialize on one thread each:
+#   capture thread per camera (drains the stream, keeps only the newest frames)
+#   -> bounded per-camera frame queue
+#   -> shared inference workers (detect batched across cameras, track faces per camera,
+#      embed and match only new or uncertain tracks)
+#   -> attendance and live embedding queues -> single writer thread (in-memory state, batched
+#      database writes, success sound)
+# Annotated frames are streamed to the web app's live view (MJPEG on RECOGNIZER_STREAM_PORT) while
+# someone watches, and shown by one display thread when RECOGNIZER_SHOW_WINDOWS is set. Attendance
+# changes and camera health go out as events on the same port for the dashboards (App1/live.py).
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+import pygame
+import torch
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils.timezone import now
+
+from .models import Attendance, CameraConfiguration, CameraStatus, Student_Registration
+from .recognition import (DetectionOptions, claim_live_embedding, get_engine, load_known_faces,
+                          store_live_embeddings)
+from .recognition.tracker import FaceTracker
+from .streaming import EventBroadcaster, FrameBroadcaster, StreamServer
+from .summaries import record_attendance_changes, refresh_attendance_summaries
+
+
+# Function to load the check-in/check-out sound, or None when no audio device is available
+def load_success_sound():
+    try:
+        pygame.mixer.init()
+        return pygame.mixer.Sound('App1/suc.wav')  # Load sound path
+    except pygame.error as e:
+        print(f"Sound disabled: {e}")
+        return None
+
+
+# Function to open a camera source as a cv2.VideoCapture
+def open_camera(cam_config):
+    # Check if the camera source is a number (local webcam) or a string (IP camera URL)
+    if cam_config.camera_source.isdigit():
+        cap = cv2.VideoCapture(int(cam_config.camera_source))
+    else:
+        cap = cv2.VideoCapture(cam_config.camera_source)
+
+    # Check if the camera opened successfully
+    if not cap.isOpened():
+        cap.release()
+        raise Exception(f"Unable to access camera {cam_config.name}.")
+    return cap
+
+
+class AttendanceCache:
+    """Today's attendance state per student primary key, kept in the writer thread.
+
+    Warmed from today's Attendance rows, so repeated recognitions of someone who is
+    already checked in (or out) are answered from memory. Check-ins and check-outs only
+    change the cached rows and mark them dirty; flush() writes every dirty row with one
+    bulk_create and one bulk_update in a single transaction, together with the matching
+    increments of the attendance summaries. Several events for the same student between
+    flushes collapse into one row write. Rows merged with one that another process created have
+    their summaries recomputed instead, since their effect on them is not known here.
+    """
+
+    def __init__(self):
+        self.date = None
+        self.records = {}   # student pk -> today's Attendance row
+        self.pending = {}   # student pk -> Attendance row changed since the last flush
+        self.stored = {}    # student pk -> (row exists, check-out stored) in the database
+        self.reconciled = set()     # student pks whose pending row was merged with another process's row
+
+    def warm(self):
+        self.date = now().date()
+        self.records = {attendance.student_registration_id: attendance
+                        for attendance in Attendance.objects.filter(date=self.date)}
+        self.stored = {student_id: (True, attendance.check_out_time is not None)
+                       for student_id, attendance in self.records.items()}
+
+    def mark(self, student_id, name):
+        """Return (message, color, changed) for the on-frame notice, or None if nothing applies."""
+        current_time = now()
+        if current_time.date() != self.date:
+            self.flush()    # yesterday's rows go out before the cache is reloaded
+            self.warm()
+
+        # Manage attendance based on check-in and check-out logic
+        attendance = self.records.get(student_id)
+        if attendance is None:
+            attendance = Attendance(
+                student_registration_id=student_id, date=self.date, check_in_time=current_time)
+            self.records[student_id] = self.pending[student_id] = attendance
+            return f"{name}, checked in.", (0, 255, 0), True
+
+        if attendance.check_in_time and not attendance.check_out_time:
+            # Check out logic: check if 1 minute has passed after check-in
+            time_diff = current_time - attendance.check_in_time
+            if time_diff.total_seconds() > 60:  # 1 minute after check-in
+                attendance.check_out_time = current_time
+                self.pending[student_id] = attendance
+                return f"{name}, checked out.", (0, 255, 0), True
+            return f"{name}, already checked in.", (0, 0, 255), False
+
+        if attendance.check_in_time and attendance.check_out_time:
+            return f"{name}, already checked out.", (0, 0, 255), False
+        return None
+
+    def flush(self):
+        """Write every dirty row in one transaction; rows stay pending if the write fails."""
+        if not self.pending:
+            return
+        try:
+            self.write(list(self.pending.values()))
+        except IntegrityError:
+            self.reconcile_pending()
+            self.write(list(self.pending.values()))
+        self.pending.clear()
+        self.reconciled.clear()
+
+    # Resolve what made a flush violate a constraint, so the retry can succeed
+    def reconcile_pending(self):
+        # Students deleted after being recognized: drop their rows
+        existing = set(Student_Registration.objects.filter(
+            pk__in=list(self.pending)).values_list('pk', flat=True))
+        for student_id in set(self.pending) - existing:
+            self.pending.pop(student_id)
+            self.records.pop(student_id, None)
+
+        # Rows another process created for the same day (unique_attendance_per_day):
+        # update that row instead, keeping its earlier check-in
+        new_ids = [student_id for student_id, attendance in self.pending.items() if attendance.pk is None]
+        for stored in Attendance.objects.filter(date=self.date, student_registration_id__in=new_ids):
+            attendance = self.pending[stored.student_registration_id]
+            attendance.pk = stored.pk
+            attendance._state.adding = False
+            attendance.check_in_time = stored.check_in_time or attendance.check_in_time
+            attendance.check_out_time = stored.check_out_time or attendance.check_out_time
+            self.stored[stored.student_registration_id] = (True, stored.check_out_time is not None)
+            self.reconciled.add(stored.student_registration_id)
+
+    def write(self, rows):
+        new_rows = [attendance for attendance in rows if attendance.pk is None]
+        changed_rows = [attendance for attendance in rows if attendance.pk is not None]
+
+        # (row, checked in, checked out) compared with what the database already holds
+        changes = []
+        reconciled = [attendance for attendance in rows
+                      if attendance.student_registration_id in self.reconciled]
+        for attendance in rows:
+            if attendance.student_registration_id in self.reconciled:
+                continue    # recomputed below
+            row_stored, check_out_stored = self.stored.get(
+                attendance.student_registration_id, (False, False))
+            changes.append((attendance, not row_stored,
+                            attendance.check_out_time is not None and not check_out_stored))
+        try:
+            with transaction.atomic():
+                Attendance.objects.bulk_create(new_rows)
+                Attendance.objects.bulk_update(
+                    changed_rows,
+                    ['check_in_time', 'check_out_time'])
+                record_attendance_changes(changes)
+                if reconciled:
+                    refresh_attendance_summaries(reconciled)
+        except Exception:
+            # The insert was rolled back, so ids handed out by it are not valid
+            for attendance in new_rows:
+                attendance.pk = None
+                attendance._state.adding = True
+            raise
+        for attendance in rows:
+            self.stored[attendance.student_registration_id] = (
+                True, attendance.check_out_time is not None)
+
+        # Backends that do not return ids from bulk inserts need them looked up for later updates
+        missing = {attendance.student_registration_id: attendance
+                   for attendance in new_rows if attendance.pk is None}
+        if missing:
+            for pk, student_id in Attendance.objects.filter(
+                    date=self.date, student_registration_id__in=list(missing)).values_list(
+                    'pk', 'student_registration_id'):
+                missing[student_id].pk = pk
+
+
+# ============================== Capture stage: one thread per camera ===========================
+class CameraSource:
+    """Read frames from one camera into a bounded queue consumed by the inference workers."""
+
+    def __init__(self, cam_config, pipeline):
+        self.cam_config = cam_config
+        self.pipeline = pipeline
+        self.frames = queue.Queue(maxsize=settings.RECOGNIZER_FRAME_QUEUE_SIZE)
+        self.in_flight = False  # a worker is processing a frame; keeps each camera in order
+        self.notice = None      # (text, color, expires_at) drawn after attendance events
+        self.tracker = FaceTracker()  # only used by the worker holding in_flight
+        self.detection = DetectionOptions.for_camera(cam_config)   # resolution and region searched
+        self.stop_event = threading.Event()
+        self.error = None
+        self.stats = {'captured': 0, 'skipped': 0, 'dropped': 0, 'frames': 0,
+                      'faces': 0, 'embedded': 0, 'fps': 0.0, 'latency_ms': None,
+                      'last_frame_time': None, 'started_at': time.time()}
+        self.fps_window = (time.time(), 0)  # (time, frames) of the last status report
+        self.thread = threading.Thread(
+            target=self.run, name=f'capture-{cam_config.pk}', daemon=True)
+
+    # Fields whose change requires the camera to be restarted
+    @staticmethod
+    def signature(cam_config):
+        return (cam_config.camera_source, cam_config.threshold, cam_config.ann_nprobe,
+                cam_config.target_fps, cam_config.frame_skip, cam_config.engine,
+                DetectionOptions.for_camera(cam_config))
+
+    # Decide whether the frame just grabbed should go to recognition (frame skip and target FPS)
+    def wants_frame(self, captured_at):
+        self.grabbed_since_last += 1
+        if self.grabbed_since_last <= self.cam_config.frame_skip:
+            return False
+        target_fps = self.cam_config.target_fps
+        if target_fps > 0 and captured_at - self.last_offered_at < 1.0 / target_fps:
+            return False
+        self.grabbed_since_last = 0
+        self.last_offered_at = captured_at
+        return True
+
+    # Put a frame in the queue, dropping the oldest one when inference is behind
+    def offer(self, frame, captured_at):
+        while True:
+            try:
+                self.frames.put_nowait((frame, captured_at))
+                break
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+        self.pipeline.notify_frame()
+
+    def run(self):
+        cap = None
+        self.grabbed_since_last = 0
+        self.last_offered_at = 0.0
+        try:
+            # Fail here, with the error shown on the status page, if the camera's engine cannot load
+            get_engine(self.cam_config.engine).load()
+            cap = open_camera(self.cam_config)
+            # Keep OpenCV's own buffer small where the backend supports it
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+            # Drain the stream continuously so recognition never runs behind the live feed;
+            # grab() skips decoding for frames that will not be recognized.
+            while not self.stop_event.is_set():
+                if not cap.grab():
+                    raise Exception(
+                        f"Failed to capture frame for camera: {self.cam_config.name}")
+                self.stats['captured'] += 1
+                captured_at = time.time()
+
+                if not self.wants_frame(captured_at):
+                    self.stats['skipped'] += 1
+                    continue
+                ret, frame = cap.retrieve()
+                if not ret:
+                    raise Exception(
+                        f"Failed to decode frame for camera: {self.cam_config.name}")
+                self.offer(frame, captured_at)
+        except Exception as e:
+            print(f"Error in capture thread for {self.cam_config.name}: {e}")
+            self.error = str(e)
+        finally:
+            if cap is not None:
+                cap.release()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def show_notice(self, text, color, seconds=2.0):
+        self.notice = (text, color, time.time() + seconds)
+
+    def status_stats(self):
+        # Recognized frames per second since the previous report
+        current_time, frames = time.time(), self.stats['frames']
+        window_start, window_frames = self.fps_window
+        if current_time > window_start:
+            self.stats['fps'] = round((frames - window_frames) / (current_time - window_start), 1)
+        self.fps_window = (current_time, frames)
+        return dict(self.stats, frame_queue=self.frames.qsize())
+
+
+# ============================== Inference, attendance and display stages shared by all cameras ===========================
+class RecognitionPipeline:
+    """Shared inference worker pool, attendance writer and display for every CameraSource."""
+
+    def __init__(self, success_sound, inference_workers=None):
+        self.success_sound = success_sound
+        self.inference_workers = inference_workers or settings.RECOGNIZER_INFERENCE_WORKERS
+        self.sources = {}               # camera pk -> CameraSource
+        self.frame_ready = threading.Condition()
+        self.attendance_queue = queue.Queue()
+        self.attendance_cache = AttendanceCache()   # owned by the attendance writer thread
+        self.live_embedding_queue = queue.Queue()   # (known faces, student pk, face) claimed live captures
+        self.annotated = {}             # camera pk -> latest annotated frame for display
+        self.broadcaster = FrameBroadcaster()
+        self.events = EventBroadcaster()    # attendance and camera health for the dashboards
+        self.stream_server = None
+        self.offset = 0                 # round-robin start so no camera is starved
+        self.stop_event = threading.Event()
+
+        self.threads = [threading.Thread(target=self.inference_loop, name=f'inference-{i}', daemon=True)
+                        for i in range(self.inference_workers)]
+        self.threads.append(threading.Thread(
+            target=self.attendance_loop, name='attendance-writer', daemon=True))
+        if settings.RECOGNIZER_SHOW_WINDOWS:
+            self.threads.append(threading.Thread(
+                target=self.display_loop, name='display', daemon=True))
+
+    def start(self):
+        # Split the cores between inference workers instead of letting each use all of them
+        torch_threads = settings.RECOGNIZER_TORCH_THREADS or max(
+            1, (os.cpu_count() or 1) // self.inference_workers)
+        torch.set_num_threads(torch_threads)
+        for thread in self.threads:
+            thread.start()
+        if settings.RECOGNIZER_STREAM_PORT:
+            try:
+                self.stream_server = StreamServer(self.broadcaster, self.events)
+                self.stream_server.start()
+            except OSError as e:
+                print(f"Live view disabled: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.stream_server is not None:
+            self.stream_server.stop()
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=10)
+
+    def add_source(self, source):
+        with self.frame_ready:
+            self.sources[source.cam_config.pk] = source
+
+    def remove_source(self, pk):
+        with self.frame_ready:
+            self.sources.pop(pk, None)
+        self.annotated.pop(pk, None)
+        self.broadcaster.remove(pk)
+
+    def notify_frame(self):
+        with self.frame_ready:
+            self.frame_ready.notify()
+
+    def queue_depths(self):
+        return {'attendance_queue': self.attendance_queue.qsize(),
+                'live_embedding_queue': self.live_embedding_queue.qsize(),
+                'attendance_pending': len(self.attendance_cache.pending),
+                'inference_workers': self.inference_workers}
+
+    # Take up to one frame per idle camera, round robin, waiting while nothing is queued
+    def next_batch(self):
+        with self.frame_ready:
+            while not self.stop_event.is_set():
+                sources = list(self.sources.values())
+                start = self.offset % len(sources) if sources else 0
+                sources = sources[start:] + sources[:start]
+                batch = []
+                for source in sources:
+                    if source.in_flight or len(batch) >= settings.RECOGNIZER_MAX_BATCH_FRAMES:
+                        continue
+                    try:
+                        frame, captured_at = source.frames.get_nowait()
+                    except queue.Empty:
+                        continue
+                    source.in_flight = True
+                    batch.append((source, frame, captured_at))
+                if batch:
+                    self.offset += 1
+                    return batch
+                self.frame_ready.wait(0.1)
+        return []
+
+    def inference_loop(self):
+        while not self.stop_event.is_set():
+            batch = self.next_batch()
+            if not batch:
+                continue
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                print(f"Error in inference worker: {e}")
+            finally:
+                with self.frame_ready:
+                    for source, frame, captured_at in batch:
+                        source.in_flight = False
+                    self.frame_ready.notify_all()
+        connection.close()  # each thread owns its database connection
+
+    def process_batch(self, batch):
+        # Convert BGR to RGB and detect the faces of every frame in one go
+        frames_rgb = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                      for source, frame, captured_at in batch]
+        # Every engine shares the MTCNN detector; each camera sets its own scale and region
+        detections = get_engine().detect(
+            frames_rgb, [source.detection for source, frame, captured_at in batch])
+
+        # Follow faces between frames; only new or uncertain tracks go through the embedder
+        tracks = [source.tracker.update(detected_faces)
+                  for (source, frame, captured_at), detected_faces in zip(batch, detections)]
+        stale = {}  # engine name -> (frame position, face) pairs, embedded in one batch per engine
+        for position, frame_tracks in enumerate(tracks):
+            for track in frame_tracks:
+                if track.needs_embedding():
+                    stale.setdefault(batch[position][0].cam_config.engine, []).append(
+                        (position, track.face))
+        for engine_name, faces in stale.items():
+            get_engine(engine_name).encode(frames_rgb, faces)
+        known_faces = load_known_faces() if stale else None
+
+        for position, (source, frame, captured_at) in enumerate(batch):
+            cam_config = source.cam_config
+            embedded = [track for track in tracks[position] if track.face.embedding is not None]
+            if embedded and len(known_faces):
+                matches = get_engine(cam_config.engine).match(
+                    known_faces, [track.face.embedding for track in embedded],
+                    cam_config.threshold, nprobe=cam_config.ann_nprobe)
+                for candidates, track in zip(matches, embedded):
+                    track.candidates = candidates
+                    track.frames_since_embed = 0
+                    if candidates and claim_live_embedding(
+                            known_faces, candidates[0].student_id, track.face, candidates[0].distance):
+                        # Stored by the writer thread, so inference never waits on the database
+                        self.live_embedding_queue.put((known_faces, candidates[0].student_id, track.face))
+            source.stats['faces'] += len(tracks[position])
+            source.stats['embedded'] += len(embedded)
+
+            for track in tracks[position]:
+                if track.candidates:
+                    self.attendance_queue.put((source, track.candidates[0]))
+
+            source.stats['frames'] += 1
+            source.stats['last_frame_time'] = time.time()
+            # Capture-to-result latency, smoothed so one slow batch does not dominate the dashboard
+            latency_ms = (source.stats['last_frame_time'] - captured_at) * 1000
+            previous = source.stats['latency_ms']
+            source.stats['latency_ms'] = round(
+                latency_ms if previous is None else 0.8 * previous + 0.2 * latency_ms, 1)
+            # Annotating and encoding only pay off when someone looks at the camera
+            if settings.RECOGNIZER_SHOW_WINDOWS or self.broadcaster.has_viewers(cam_config.pk):
+                self.annotate(source, frame, tracks[position])
+                if settings.RECOGNIZER_SHOW_WINDOWS:
+                    self.annotated[cam_config.pk] = frame
+                self.broadcaster.publish(cam_config.pk, frame)
+
+    # Draw bounding boxes, names and the latest attendance notice on the frame
+    def annotate(self, source, frame, tracks):
+        polygon = source.detection.roi_polygon(frame.shape[1], frame.shape[0])
+        if polygon is not None:
+            cv2.polylines(frame, [polygon.astype(np.int32)], True, (255, 255, 0), 1, cv2.LINE_AA)
+        for track in tracks:
+            if track.candidates is None:
+                continue    # not embedded yet (crop outside the image or empty gallery)
+            name = track.candidates[0].name if track.candidates else 'Not Recognized'
+            (x1, y1, x2, y2) = map(int, track.face.box)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(
+                frame, name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+
+        # Show the latest attendance notice for this camera for a couple of seconds
+        if source.notice and source.notice[2] > time.time():
+            text, color, expires_at = source.notice
+            cv2.putText(frame, text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX,
+                        1, color, 2, cv2.LINE_AA)
+
+    # Writer stage: all attendance and live embedding database work happens here, off the video path
+    def attendance_loop(self):
+        flush_interval = settings.ATTENDANCE_FLUSH_INTERVAL_MS / 1000.0
+        try:
+            self.attendance_cache.warm()
+        except Exception as e:
+            print(f"Error loading today's attendance: {e}")
+
+        next_flush = time.time() + flush_interval
+        while not self.stop_event.is_set() or not self.attendance_queue.empty():
+            try:
+                source, match = self.attendance_queue.get(
+                    timeout=max(0.0, min(0.1, next_flush - time.time())))
+            except queue.Empty:
+                source = None
+
+            if source is not None:
+                try:
+                    result = self.attendance_cache.mark(match.student_id, match.name)
+                except Exception as e:
+                    print(f"Error marking attendance for {match.stu_id}: {e}")
+                    result = None
+                if result is not None:
+                    text, color, changed = result
+                    source.show_notice(text, color)
+                    if changed:
+                        self.publish_attendance(source, match)
+                        if self.success_sound:
+                            self.success_sound.play()
+
+            # Write the coalesced changes every flush interval or once enough have piled up
+            if time.time() >= next_flush or \
+                    len(self.attendance_cache.pending) >= settings.ATTENDANCE_FLUSH_MAX_EVENTS:
+                self.flush_attendance()
+                self.store_live_embeddings()
+                next_flush = time.time() + flush_interval
+
+        self.flush_attendance()     # nothing recorded before shutdown is lost
+        self.store_live_embeddings()
+        connection.close()
+
+    def publish_attendance(self, source, match):
+        attendance = self.attendance_cache.records[match.student_id]
+        checked_out = attendance.check_out_time is not None
+        self.events.publish('attendance', {
+            'camera': source.cam_config.pk,
+            'camera_name': source.cam_config.name,
+            'student_id': match.student_id,
+            'stu_id': match.stu_id,
+            'name': match.name,
+            'action': 'check_out' if checked_out else 'check_in',
+            'time': (attendance.check_out_time if checked_out else attendance.check_in_time).isoformat(),
+        })
+
+    def flush_attendance(self):
+        try:
+            self.attendance_cache.flush()
+        except Exception as e:
+            print(f"Error writing attendance: {e}")
+
+    # Store the live captures claimed by the inference workers since the last flush
+    def store_live_embeddings(self):
+        captures = {}   # id(known faces) -> (known faces, [(student pk, face)]) per gallery that claimed them
+        while True:
+            try:
+                known_faces, student_id, face = self.live_embedding_queue.get_nowait()
+            except queue.Empty:
+                break
+            captures.setdefault(id(known_faces), (known_faces, []))[1].append((student_id, face))
+        for known_faces, faces in captures.values():
+            store_live_embeddings(known_faces, faces)
+
+    # Display stage: every window is drawn from this one thread
+    def display_loop(self):
+        windows = {}    # camera pk -> window name
+        while not self.stop_event.is_set():
+            for pk in list(windows):
+                if pk not in self.sources:
+                    cv2.destroyWindow(windows.pop(pk))
+            if not self.annotated:
+                self.stop_event.wait(0.05)
+                continue
+
+            for pk, frame in list(self.annotated.items()):
+                source = self.sources.get(pk)
+                if source is None:
+                    continue
+                windows.setdefault(
+                    pk, f'Face Recognition - {source.cam_config.name}')
+                cv2.imshow(windows[pk], frame)
+
+            if cv2.waitKey(10) & 0xFF == ord('q'):
+                # 'q' stops the running cameras until they are started again from the web app
+                CameraConfiguration.objects.filter(
+                    pk__in=list(self.sources)).update(is_enabled=False)
+
+        for window_name in windows.values():
+            cv2.destroyWindow(window_name)
+        connection.close()
+
+
+class RecognizerService:
+    """Supervise one CameraSource per enabled camera, feeding a shared RecognitionPipeline.
+
+    Every poll interval the service starts newly enabled cameras, stops disabled or
+    deleted ones, restarts cameras whose configuration changed or whose capture thread
+    died (after RECOGNIZER_RESTART_DELAY seconds) and writes a CameraStatus heartbeat
+    including the queue depth of every stage.
+    """
+
+    def __init__(self, poll_interval=None, restart_delay=None):
+        self.poll_interval = poll_interval or settings.RECOGNIZER_POLL_INTERVAL
+        self.restart_delay = restart_delay or settings.RECOGNIZER_RESTART_DELAY
+        self.pipeline = RecognitionPipeline(load_success_sound())
+        self.sources = {}       # camera pk -> CameraSource
+        self.restart_at = {}    # camera pk -> time before which it is not restarted
+        self.errors = {}        # camera pk -> last error message
+        self.stop_event = threading.Event()
+
+    def run(self):
+        get_engine().load()   # load the face models before the first camera frame arrives
+        self.pipeline.start()
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                self.reconcile()
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def reconcile(self):
+        configs = {config.pk: config for config in CameraConfiguration.objects.all()}
+
+        for pk, source in list(self.sources.items()):
+            config = configs.get(pk)
+            if config is None or not config.is_enabled or \
+                    CameraSource.signature(config) != CameraSource.signature(source.cam_config):
+                source.stop()
+            if not source.thread.is_alive():
+                del self.sources[pk]
+                self.pipeline.remove_source(pk)
+                if source.error:
+                    self.errors[pk] = source.error
+                    self.restart_at[pk] = time.time() + self.restart_delay
+
+        for pk, config in configs.items():
+            if config.is_enabled and pk not in self.sources and time.time() >= self.restart_at.get(pk, 0):
+                source = CameraSource(config, self.pipeline)
+                self.sources[pk] = source
+                self.pipeline.add_source(source)
+                source.start()
+            elif not config.is_enabled:
+                self.errors.pop(pk, None)
+                self.restart_at.pop(pk, None)
+
+        self.report(configs)
+
+    def report(self, configs):
+        pipeline_stats = self.pipeline.queue_depths()
+        for pk, config in configs.items():
+            source = self.sources.get(pk)
+            if source is not None:
+                state, message, stats = CameraStatus.RUNNING, '', source.status_stats()
+            elif config.is_enabled and pk in self.errors:
+                state, message, stats = CameraStatus.RESTARTING, self.errors[pk], {}
+            else:
+                state, message, stats = CameraStatus.STOPPED, '', {}
+            stats['pipeline'] = pipeline_stats
+            heartbeat = now()
+            CameraStatus.objects.update_or_create(camera=config, defaults={
+                'state': state,
+                'message': message,
+                'last_heartbeat': heartbeat,
+                'stats': stats,
+            })
+            # Same fields as views.camera_status_data, pushed to the dashboards' live feed
+            self.pipeline.events.publish('camera', {
+                'id': pk,
+                'name': config.name,
+                'is_enabled': config.is_enabled,
+                'state': state,
+                'message': message,
+                'last_heartbeat': heartbeat.isoformat(),
+                'service_alive': True,
+                'stats': stats,
+            })
+
+    def shutdown(self):
+        for source in self.sources.values():
+            source.stop()
+        for source in self.sources.values():
+            source.thread.join(timeout=10)
+        self.sources.clear()
+        self.pipeline.stop()
+        CameraStatus.objects.update(
+            state=CameraStatus.STOPPED, stats={}, last_heartbeat=now())
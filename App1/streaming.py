@@ -0,0 +1,205 @@
+# Live view of the recognizer cameras for browsers, replacing the OpenCV windows on headless hosts.
+# The recognizer process serves an MJPEG stream per camera on RECOGNIZER_STREAM_HOST:PORT; the web
+# app proxies it (views.camera_stream) so only logged-in admins can watch and the recognizer port
+# can stay bound to localhost. Each annotated frame is downscaled and JPEG-encoded once, however
+# many viewers there are, and not at all while nobody watches that camera.
+#
+# The same server publishes attendance and camera health events as Server-Sent Events on /events,
+# read by the web app's live feed (App1/live.py).
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+from django.conf import settings
+
+BOUNDARY = 'frame'
+
+
+class FrameBroadcaster:
+    """Latest JPEG of every camera, shared by all of its viewers."""
+
+    def __init__(self, max_width=None, jpeg_quality=None):
+        self.max_width = max_width or settings.RECOGNIZER_STREAM_MAX_WIDTH
+        self.jpeg_quality = jpeg_quality or settings.RECOGNIZER_STREAM_JPEG_QUALITY
+        self.changed = threading.Condition()
+        self.viewers = {}   # camera pk -> number of connected viewers
+        self.latest = {}    # camera pk -> (sequence number, JPEG bytes)
+        self.closed = False
+
+    def has_viewers(self, pk):
+        return self.viewers.get(pk, 0) > 0
+
+    # Encode and hand a frame to the viewers of a camera; a no-op while nobody is watching
+    def publish(self, pk, frame):
+        if not self.has_viewers(pk):
+            return
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)),
+                               interpolation=cv2.INTER_AREA)
+        ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ret:
+            return
+        with self.changed:
+            sequence = self.latest.get(pk, (0, None))[0] + 1
+            self.latest[pk] = (sequence, jpeg.tobytes())
+            self.changed.notify_all()
+
+    # Drop the last frame of a stopped camera so viewers do not keep a stale picture
+    def remove(self, pk):
+        with self.changed:
+            self.latest.pop(pk, None)
+            self.changed.notify_all()
+
+    def close(self):
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+
+    def frames(self, pk):
+        """Yield each new JPEG of a camera until the broadcaster closes; counts as a viewer meanwhile."""
+        with self.changed:
+            self.viewers[pk] = self.viewers.get(pk, 0) + 1
+        try:
+            seen = 0
+            while True:
+                with self.changed:
+                    while not self.closed and self.latest.get(pk, (0, None))[0] == seen:
+                        self.changed.wait()
+                    if self.closed:
+                        return
+                    seen, jpeg = self.latest.get(pk, (0, None))
+                if jpeg is not None:
+                    yield jpeg
+        finally:
+            with self.changed:
+                self.viewers[pk] -= 1
+                if not self.viewers[pk]:
+                    self.latest.pop(pk, None)   # the next viewer must not start on an old frame
+
+
+# Function to format one Server-Sent Events message
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventBroadcaster:
+    """Recognizer events fanned out to every connected /events client."""
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers = set()    # one queue of encoded messages per client
+        self.closed = False
+
+    def publish(self, event, data):
+        if not self.subscribers:
+            return
+        message = sse_message(event, data).encode()
+        with self.lock:
+            for messages in self.subscribers:
+                while True:
+                    try:
+                        messages.put_nowait(message)
+                        break
+                    except queue.Full:
+                        try:
+                            messages.get_nowait()   # a slow client loses its oldest events
+                        except queue.Empty:
+                            pass
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            for messages in self.subscribers:
+                try:
+                    messages.put_nowait(None)   # wake the client so its response ends now
+                except queue.Full:
+                    pass
+
+    def messages(self, keepalive=15.0):
+        """Yield encoded events, or a comment every keepalive seconds, until the broadcaster closes."""
+        messages = queue.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers.add(messages)
+        try:
+            while not self.closed:
+                try:
+                    message = messages.get(timeout=keepalive)
+                except queue.Empty:
+                    message = b': keep-alive\n\n'
+                if message is None:
+                    return
+                yield message
+        finally:
+            with self.lock:
+                self.subscribers.discard(messages)
+
+
+class StreamRequestHandler(BaseHTTPRequestHandler):
+    """Serve /cameras/<pk>/stream.mjpg as multipart/x-mixed-replace JPEG frames and /events as SSE."""
+
+    def do_GET(self):
+        if self.path == '/events':
+            self.send_events()
+            return
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'cameras' or not parts[1].isdigit() or \
+                parts[2] != 'stream.mjpg':
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        self.send_header('Cache-Control', 'no-cache, private')
+        self.end_headers()
+        try:
+            for jpeg in self.server.broadcaster.frames(int(parts[1])):
+                self.wfile.write(
+                    f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                    f'Content-Length: {len(jpeg)}\r\n\r\n'.encode() + jpeg + b'\r\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass    # the viewer went away
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            for message in self.server.events.messages():
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass    # one line per viewer connection would flood the recognizer log
+
+
+class StreamServer:
+    """HTTP server for the camera streams and events, running on its own thread in the recognizer process."""
+
+    def __init__(self, broadcaster, events, host=None, port=None):
+        self.broadcaster = broadcaster
+        self.events = events
+        self.server = ThreadingHTTPServer(
+            (host or settings.RECOGNIZER_STREAM_HOST, port or settings.RECOGNIZER_STREAM_PORT),
+            StreamRequestHandler)
+        self.server.daemon_threads = True
+        self.server.broadcaster = broadcaster
+        self.server.events = events
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name='stream-server', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.broadcaster.close()    # ends the viewers' responses
+        self.events.close()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,158 @@
+# Precomputed attendance aggregates, so reports read one row per day (or month) instead of
+# scanning every Attendance row. The recognizer's attendance writer applies its check-ins
+# and check-outs incrementally in the same transaction as the rows themselves, and recomputes the
+# summaries of rows it merged with one another process wrote; the admin recomputes those of the rows
+# it adds or deletes. Attendance changed any other way (imports, the shell) is picked up by
+# `manage.py backfill_attendance_summaries`.
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Attendance, DailyDepartmentSummary, MonthlyStudentSummary, Student_Registration
+
+
+# Function to get the check-in to check-out time of an attendance row in seconds
+def stay_seconds(attendance):
+    if attendance.check_in_time and attendance.check_out_time:
+        return (attendance.check_out_time - attendance.check_in_time).total_seconds()
+    return 0.0
+
+
+# Function to add attendance transitions to the summaries
+def record_attendance_changes(changes):
+    """Apply (attendance, checked_in, checked_out) transitions to the daily and monthly summaries.
+
+    checked_in counts a new attendance row, checked_out a new check-out of that row.
+    Counters are incremented with F() expressions, so concurrent writers do not lose updates.
+    """
+    changes = [change for change in changes if change[1] or change[2]]
+    if not changes:
+        return
+    departments = dict(Student_Registration.objects.filter(
+        pk__in={attendance.student_registration_id for attendance, _, _ in changes}
+    ).values_list('pk', 'department'))
+
+    daily = defaultdict(lambda: [0, 0, 0.0])     # (date, department) -> deltas
+    monthly = defaultdict(lambda: [0, 0, 0.0])   # (student pk, month) -> deltas
+    for attendance, checked_in, checked_out in changes:
+        department = departments.get(attendance.student_registration_id)
+        if department is None:
+            continue    # student deleted meanwhile
+        stay = stay_seconds(attendance) if checked_out else 0.0
+        month = attendance.date.replace(day=1)
+        for deltas in (daily[(attendance.date, department)],
+                       monthly[(attendance.student_registration_id, month)]):
+            deltas[0] += int(checked_in)
+            deltas[1] += int(checked_out)
+            deltas[2] += stay
+
+    with transaction.atomic():
+        DailyDepartmentSummary.objects.bulk_create(
+            [DailyDepartmentSummary(date=date, department=department) for date, department in daily],
+            ignore_conflicts=True)
+        MonthlyStudentSummary.objects.bulk_create(
+            [MonthlyStudentSummary(student_registration_id=student_id, month=month)
+             for student_id, month in monthly],
+            ignore_conflicts=True)
+        for (date, department), (present, checked_out, stay) in daily.items():
+            DailyDepartmentSummary.objects.filter(date=date, department=department).update(
+                present_count=F('present_count') + present,
+                checked_out_count=F('checked_out_count') + checked_out,
+                total_stay_seconds=F('total_stay_seconds') + stay)
+        for (student_id, month), (present, checked_out, stay) in monthly.items():
+            MonthlyStudentSummary.objects.filter(student_registration_id=student_id, month=month).update(
+                days_present=F('days_present') + present,
+                days_checked_out=F('days_checked_out') + checked_out,
+                total_stay_seconds=F('total_stay_seconds') + stay)
+
+
+# Function to recompute the summary rows a few attendance rows count towards, from the Attendance table
+def refresh_attendance_summaries(attendances):
+    """Recompute the daily (date, department) and monthly (student, month) summaries of the given rows.
+
+    For rows whose effect on the summaries is unknown, e.g. written by another process.
+    """
+    departments = dict(Student_Registration.objects.filter(
+        pk__in={attendance.student_registration_id for attendance in attendances}
+    ).values_list('pk', 'department'))
+    days = {(attendance.date, departments[attendance.student_registration_id])
+            for attendance in attendances if attendance.student_registration_id in departments}
+    months = {(attendance.student_registration_id, attendance.date.replace(day=1))
+              for attendance in attendances if attendance.student_registration_id in departments}
+    stay = ExpressionWrapper(F('check_out_time') - F('check_in_time'), output_field=DurationField())
+    totals = dict(present=Count('pk'), checked_out=Count('check_out_time'), stay=Sum(stay))
+
+    with transaction.atomic():
+        for date, department in days:
+            row = Attendance.objects.filter(
+                date=date, student_registration__department=department).aggregate(**totals)
+            if not row['present']:
+                # Like rebuild_summaries(), no summary row without attendance
+                DailyDepartmentSummary.objects.filter(date=date, department=department).delete()
+                continue
+            DailyDepartmentSummary.objects.update_or_create(date=date, department=department, defaults={
+                'present_count': row['present'], 'checked_out_count': row['checked_out'],
+                'total_stay_seconds': row['stay'].total_seconds() if row['stay'] else 0.0})
+        for student_id, month in months:
+            next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+            row = Attendance.objects.filter(
+                student_registration_id=student_id, date__gte=month, date__lt=next_month).aggregate(**totals)
+            if not row['present']:
+                MonthlyStudentSummary.objects.filter(student_registration_id=student_id, month=month).delete()
+                continue
+            MonthlyStudentSummary.objects.update_or_create(student_registration_id=student_id, month=month, defaults={
+                'days_present': row['present'], 'days_checked_out': row['checked_out'],
+                'total_stay_seconds': row['stay'].total_seconds() if row['stay'] else 0.0})
+
+
+# Function to recompute the summaries from the Attendance table
+def rebuild_summaries(start_date=None, end_date=None):
+    """Replace the summaries of the whole months touching the range with fresh aggregates.
+
+    Returns the number of (daily, monthly) summary rows written.
+    """
+    # Monthly rows cover whole months, so widen the range to month boundaries
+    attendance = Attendance.objects.all()
+    if start_date:
+        start_date = start_date.replace(day=1)
+        attendance = attendance.filter(date__gte=start_date)
+    if end_date:
+        end_date = (end_date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - \
+            datetime.timedelta(days=1)
+        attendance = attendance.filter(date__lte=end_date)
+    stay = ExpressionWrapper(F('check_out_time') - F('check_in_time'), output_field=DurationField())
+
+    daily_rows = attendance.values('date', 'student_registration__department').annotate(
+        present=Count('pk'), checked_out=Count('check_out_time'), stay=Sum(stay)).order_by()
+    monthly_rows = attendance.annotate(month=TruncMonth('date')).values(
+        'student_registration', 'month').annotate(
+        present=Count('pk'), checked_out=Count('check_out_time'), stay=Sum(stay)).order_by()
+
+    with transaction.atomic():
+        daily = [DailyDepartmentSummary(
+            date=row['date'], department=row['student_registration__department'],
+            present_count=row['present'], checked_out_count=row['checked_out'],
+            total_stay_seconds=row['stay'].total_seconds() if row['stay'] else 0.0)
+            for row in daily_rows.iterator()]
+        monthly = [MonthlyStudentSummary(
+            student_registration_id=row['student_registration'], month=row['month'],
+            days_present=row['present'], days_checked_out=row['checked_out'],
+            total_stay_seconds=row['stay'].total_seconds() if row['stay'] else 0.0)
+            for row in monthly_rows.iterator()]
+
+        old_daily = DailyDepartmentSummary.objects.all()
+        old_monthly = MonthlyStudentSummary.objects.all()
+        if start_date:
+            old_daily = old_daily.filter(date__gte=start_date)
+            old_monthly = old_monthly.filter(month__gte=start_date)
+        if end_date:
+            old_daily = old_daily.filter(date__lte=end_date)
+            old_monthly = old_monthly.filter(month__lte=end_date)
+        old_daily.delete()
+        old_monthly.delete()
+        DailyDepartmentSummary.objects.bulk_create(daily, batch_size=1000)
+        MonthlyStudentSummary.objects.bulk_create(monthly, batch_size=1000)
+    return len(daily), len(monthly)
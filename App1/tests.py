@@ -1,3 +1,538 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (Attendance, CameraConfiguration, DailyDepartmentSummary, FaceEmbedding, MonthlyStudentSummary,
+                     Student_Registration)
+from .recognition import (DetectedFace, DetectionOptions, FaceEngine, KnownFaces, add_to_face_index, claim_live_embedding, find_duplicate_students,
+                          match_faces, store_live_embeddings, update_face_index)
+from .recognition.ann_index import IVFIndex
+from .recognition.tracker import FaceTracker
+from .recognizer import AttendanceCache
+from .summaries import rebuild_summaries
+
+
+class AttendanceListTests(TestCase):
+    """The attendance list and its CSV report: a fixed number of queries, however many students
+    there are, and filters that cannot fail the page."""
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+
+    # Function to replace the attendance data with one day of records for count students
+    def create_attendance(self, count):
+        Student_Registration.objects.all().delete()
+        students = Student_Registration.objects.bulk_create([
+            Student_Registration(
+                stu_id=f'S{number:04d}', name=f'Student {number}', email=f's{number}@example.com',
+                phone_number='0123456789', designation='Student',
+                department='CSE' if number % 2 else 'EEE', profile_image=f'student_images/S{number:04d}.jpg')
+            for number in range(count)])
+        check_in = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
+        Attendance.objects.bulk_create([
+            Attendance(student_registration=student, date=check_in.date(), check_in_time=check_in,
+                       check_out_time=check_in + datetime.timedelta(hours=3))
+            for student in students])
+
+    def test_attendance_list_query_count(self):
+        for count in (12, 300):
+            self.create_attendance(count)
+            # Session, user, page count and the page of records joined with their students
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('attendance_list'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['page_obj'].paginator.count, count)
+
+    def test_download_report_query_count(self):
+        for count in (12, 300):
+            self.create_attendance(count)
+            # Session, user and the streamed records; the report is read inside the block
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('attendance_list'), {'download_report': 'true'})
+                report = b''.join(response.streaming_content).decode()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(report.strip().splitlines()), count + 1)   # header row
+
+    def test_invalid_dates_are_ignored(self):
+        self.create_attendance(3)
+        response = self.client.get(reverse('attendance_list'),
+                                   {'start_date': 'foo', 'end_date': '2024-02-30', 'search': 'Student'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+        self.assertEqual(len(list(response.context['messages'])), 2)
+        self.assertNotIn('end_date', response.context['filter_query'])
+
+
+class AttendanceSummaryTests(TestCase):
+    """The summary endpoints answer impossible dates with a 400, not a server error."""
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+
+    def test_invalid_dates(self):
+        for name, params in [('attendance_summary_daily', {'start_date': '2024-02-30'}),
+                             ('attendance_summary_daily', {'end_date': '2024-04-31'}),
+                             ('attendance_summary_monthly', {'month': '2024-13'})]:
+            response = self.client.get(reverse(name), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_valid_dates(self):
+        response = self.client.get(reverse('attendance_summary_daily'),
+                                   {'start_date': '2024-02-01', 'end_date': '2024-02-29'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['days'], [])
+        response = self.client.get(reverse('attendance_summary_monthly'), {'month': '2024-02'})
+        self.assertEqual(response.json()['month'], '2024-02')
+
+
+class AttendanceCacheTests(TestCase):
+    """Repeated recognitions are answered from the writer's cache; only a flush touches the database."""
+
+    def test_marks_from_memory(self):
+        student = Student_Registration.objects.create(
+            stu_id='S1', name='Student 1', email='s1@example.com', phone_number='0123456789',
+            designation='Student', department='CSE', profile_image='student_images/S1.jpg')
+        cache = AttendanceCache()
+        cache.warm()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.mark(student.pk, student.name)[2], True)     # checked in
+            for _ in range(5):
+                self.assertEqual(cache.mark(student.pk, student.name)[2], False)    # already checked in
+        cache.flush()
+        attendance = Attendance.objects.get()
+        self.assertIsNone(attendance.check_out_time)
+
+        later = timezone.now() + datetime.timedelta(minutes=2)
+        with self.assertNumQueries(0), mock.patch('App1.recognizer.now', return_value=later):
+            self.assertEqual(cache.mark(student.pk, student.name)[0], 'Student 1, checked out.')
+            self.assertEqual(cache.mark(student.pk, student.name)[0], 'Student 1, already checked out.')
+        cache.flush()
+        attendance.refresh_from_db()
+        self.assertEqual(attendance.check_out_time, later)
+
+        # A restarted writer picks today's state up from the database
+        cache = AttendanceCache()
+        cache.warm()
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.mark(student.pk, student.name)[0], 'Student 1, already checked out.')
+
+
+class IncrementalSummaryTests(TestCase):
+    """The attendance writer's incremental summaries agree with rebuilding them from the Attendance table."""
+
+    # Both summaries as sorted tuples, stay seconds rounded since sums of floats depend on their order
+    def summaries(self):
+        daily = DailyDepartmentSummary.objects.values_list(
+            'date', 'department', 'present_count', 'checked_out_count', 'total_stay_seconds')
+        monthly = MonthlyStudentSummary.objects.values_list(
+            'student_registration_id', 'month', 'days_present', 'days_checked_out', 'total_stay_seconds')
+        return ([row[:-1] + (round(row[-1], 3),) for row in sorted(daily)],
+                [row[:-1] + (round(row[-1], 3),) for row in sorted(monthly)])
+
+    def assertMatchesRebuild(self):
+        incremental = self.summaries()
+        rebuild_summaries()
+        self.assertEqual(incremental, self.summaries())
+
+    def test_rows_merged_with_another_process(self):
+        first, second = Student_Registration.objects.bulk_create([
+            Student_Registration(stu_id=f'S{number}', name=f'Student {number}', email=f's{number}@example.com',
+                                 phone_number='0123456789', designation='Student', department='CSE',
+                                 profile_image=f'student_images/S{number}.jpg')
+            for number in (1, 2)])
+        cache = AttendanceCache()
+        cache.warm()
+        # Written by another process after the cache was warmed, without touching the summaries
+        Attendance.objects.create(student_registration=second,
+                                  check_in_time=timezone.now() - datetime.timedelta(minutes=30))
+
+        cache.mark(first.pk, first.name)
+        cache.mark(second.pk, second.name)
+        cache.flush()   # the second row hits unique_attendance_per_day and is merged
+        self.assertEqual(DailyDepartmentSummary.objects.get().present_count, 2)
+        self.assertMatchesRebuild()
+
+        later = timezone.now() + datetime.timedelta(hours=2)
+        with mock.patch('App1.recognizer.now', return_value=later):
+            cache.mark(first.pk, first.name)
+            cache.mark(second.pk, second.name)
+        cache.flush()
+        self.assertEqual(DailyDepartmentSummary.objects.get().checked_out_count, 2)
+        self.assertMatchesRebuild()
+
+    def test_admin_delete(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        student = Student_Registration.objects.create(
+            stu_id='S1', name='Student 1', email='s1@example.com', phone_number='0123456789',
+            designation='Student', department='CSE', profile_image='student_images/S1.jpg')
+        attendance = Attendance.objects.create(student_registration=student, check_in_time=timezone.now())
+        rebuild_summaries()
+
+        self.client.post(reverse('admin:App1_attendance_delete', args=[attendance.pk]), {'post': 'yes'})
+        self.assertFalse(Attendance.objects.exists())
+        self.assertMatchesRebuild()
+        self.assertEqual(self.summaries(), ([], []))
+
+
+class CameraConfigFormTests(TestCase):
+    """The region of interest typed in the camera form is validated with readable messages."""
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+
+    def post_camera(self, roi):
+        return self.client.post(reverse('camera_config_create'), {
+            'name': 'Door', 'camera_source': '0', 'threshold': '0.6', 'roi': roi})
+
+    def test_malformed_roi(self):
+        for roi, message in [('0,0,1; 1,0; 1,1', 'must be x,y'), ('0,0; a,1; 1,1', 'must be x,y'),
+                             ('0,0; 2,1; 1,1', 'between 0 and 1'), ('0,0; 1,1', 'at least 3 points')]:
+            response = self.post_camera(roi)
+            self.assertEqual(response.status_code, 200, roi)
+            self.assertIn(message, [str(m) for m in response.context['messages']][0])
+        self.assertFalse(CameraConfiguration.objects.exists())
+
+    def test_roi_saved(self):
+        response = self.post_camera('0,0.2; 0.6,0.2; 0.6,1')
+        self.assertRedirects(response, reverse('camera_config_list'))
+        self.assertEqual(CameraConfiguration.objects.get().roi, [[0.0, 0.2], [0.6, 0.2], [0.6, 1.0]])
+
+
+class CameraStreamTests(TestCase):
+    """The live view relay runs on the event loop and fails cleanly when it cannot."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_needs_asgi(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('camera_stream', args=[1]))
+        self.assertEqual(response.status_code, 501)
+
+    async def test_recognizer_not_running(self):
+        client = AsyncClient()
+        await client.aforce_login(self.admin)
+        # Nothing listens on the discard port
+        with self.settings(RECOGNIZER_STREAM_URL='http://127.0.0.1:9'):
+            response = await client.get(reverse('camera_stream', args=[1]))
+        self.assertEqual(response.status_code, 503)
+
+
+class RegisterStudentTests(TestCase):
+    """Registration reports what happened to the student, and leaves no files behind when it fails."""
+
+    def setUp(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.media = self.settings(
+            MEDIA_ROOT=media_root, FACE_INDEX_DIR=os.path.join(media_root, 'face_index'),
+            FACE_GALLERY_VERSION_FILE=os.path.join(media_root, 'face_index', 'gallery.version'))
+        self.media.enable()
+        self.addCleanup(self.media.disable)
+        self.media_root = media_root
+
+        face = DetectedFace(box=np.array([0, 0, 160, 160]), probability=0.999, landmarks=np.zeros((5, 2)),
+                            embedding=np.full(512, 512 ** -0.5, dtype=np.float32))
+        detect = mock.patch('App1.views.detect_enrolment_face',
+                            return_value=(face, np.zeros((160, 160, 3), dtype=np.uint8), None))
+        detect.start()
+        self.addCleanup(detect.stop)
+
+    def register(self, stu_id, email):
+        jpeg = cv2.imencode('.jpg', np.zeros((200, 200, 3), dtype=np.uint8))[1].tobytes()
+        return self.client.post(reverse('register_stu'), {
+            'name': 'Student', 'stu_id': stu_id, 'email': email, 'phone_number': '0123456789',
+            'designation': 'Student', 'department': 'CSE',
+            'image_data': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode()})
+
+    def stored_files(self):
+        return sorted(name for _, _, names in os.walk(self.media_root) for name in names if name.endswith('.jpg'))
+
+    def test_index_failure_does_not_fail_registration(self):
+        with mock.patch('App1.views.update_face_index', side_effect=OSError("index locked")):
+            response = self.register('S1', 's1@example.com')
+        self.assertRedirects(response, reverse('register_success'))
+        self.assertTrue(Student_Registration.objects.filter(stu_id='S1').exists())
+
+    def test_failed_save_removes_files(self):
+        self.register('S1', 's1@example.com')
+        files = self.stored_files()
+        response = self.register('S1', 's2@example.com')    # duplicate stu_id
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Student_Registration.objects.count(), 1)
+        self.assertEqual(FaceEmbedding.objects.count(), 1)
+        self.assertEqual(self.stored_files(), files)
+
+
+class DuplicateEnrolmentTests(TestCase):
+    """The duplicate check at registration reads stored embeddings only."""
+
+    def create_student(self, number, vectors):
+        student = Student_Registration.objects.create(
+            stu_id=f'S{number}', name=f'Student {number}', email=f's{number}@example.com',
+            phone_number='0123456789', designation='Student', department='CSE',
+            profile_image=f'student_images/S{number}.jpg')
+        for vector in vectors:
+            FaceEmbedding.objects.create(student_registration=student, embedding=vector.tobytes(),
+                                         source=FaceEmbedding.CAPTURE)
+        return student
+
+    def test_matches_stored_centroids(self):
+        rng = np.random.default_rng(0)
+        faces = rng.normal(size=(2, 512)).astype(np.float32)
+        faces /= np.linalg.norm(faces, axis=1, keepdims=True)
+        first = self.create_student(1, [faces[0], faces[0] + 0.001])
+        self.create_student(2, [faces[1]])
+        # Enrolled before embeddings were stored and its image is missing; it must be skipped, not encoded
+        legacy = self.create_student(3, [])
+
+        matches = find_duplicate_students([faces[0]])
+        self.assertEqual([match.student_id for match in matches], [first.pk])
+        self.assertEqual(matches[0].stu_id, 'S1')
+        self.assertLess(matches[0].distance, 0.1)
+        self.assertEqual(find_duplicate_students([-faces[0]]), [])
+        self.assertFalse(FaceEmbedding.objects.filter(student_registration=legacy).exists())
+
+
+class LiveEmbeddingTests(TransactionTestCase):
+    """Live captures are written one by one, so a student deleted meanwhile costs only their own capture."""
+
+    def test_deleted_student_is_skipped(self):
+        student = Student_Registration.objects.create(
+            stu_id='S1', name='Student 1', email='s1@example.com', phone_number='0123456789',
+            designation='Student', department='CSE', profile_image='student_images/S1.jpg')
+        deleted_id = student.pk + 1
+        known_faces = KnownFaces(np.zeros((2, 512), dtype=np.float32), ['Student 1', 'Deleted'],
+                                 [deleted_id, student.pk], ['S2', 'S1'])
+        face = DetectedFace(box=np.zeros(4), probability=0.999, landmarks=np.zeros((5, 2)),
+                            embedding=np.ones(512, dtype=np.float32))
+
+        self.assertTrue(claim_live_embedding(known_faces, deleted_id, face, 0.1))
+        self.assertTrue(claim_live_embedding(known_faces, student.pk, face, 0.1))
+        self.assertFalse(claim_live_embedding(known_faces, student.pk, face, 0.1))   # one per gallery build
+
+        stored = store_live_embeddings(known_faces, [(deleted_id, face), (student.pk, face)])
+        self.assertEqual(stored, [student.pk])
+        self.assertEqual(FaceEmbedding.objects.get().student_registration_id, student.pk)
+        # The failed claim is given back
+        self.assertNotIn(deleted_id, known_faces.live_captured)
+        self.assertEqual(known_faces.live_counts[deleted_id], 0)
+
+
+class FaceIndexTests(TestCase):
+    """Concurrent writers of the persisted IVF index keep each other's changes, and readers never see a mix."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(200, 512)).astype(np.float32)
+        IVFIndex.train(self.vectors[:100], np.arange(100), nlist=8).save(self.directory)
+
+    def test_full_probe_matches_brute_force(self):
+        face_index = IVFIndex.load(self.directory)
+        queries = self.vectors[100:110]
+        ids, distances = face_index.search(queries, nprobe=len(face_index.centroids), top_k=5)
+        # The index was trained with ids equal to the row numbers
+        expected_ids, expected_distances = match_faces(self.vectors[:100], queries, top_k=5)
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-4)
+
+    def test_concurrent_updates(self):
+        errors = []
+        writing = threading.Event()
+
+        def write(first_id):
+            add_to_face_index(list(range(first_id, first_id + 10)), self.vectors[first_id:first_id + 10])
+
+        def read():
+            while writing.is_set():
+                face_index = IVFIndex.load(self.directory)
+                if not len(face_index.ids) == len(face_index.vectors) == len(face_index.assignments):
+                    errors.append(len(face_index.ids))
+
+        with self.settings(FACE_INDEX_DIR=self.directory):
+            writing.set()
+            reader = threading.Thread(target=read)
+            reader.start()
+            writers = [threading.Thread(target=write, args=(first_id,)) for first_id in range(100, 200, 10)]
+            for thread in writers:
+                thread.start()
+            for thread in writers:
+                thread.join()
+            writing.clear()
+            reader.join()
+
+        face_index = IVFIndex.load(self.directory)
+        self.assertEqual(sorted(face_index.ids.tolist()), list(range(200)))
+        self.assertEqual(errors, [])
+        # Only the current and the previous version are kept
+        versions = [entry for entry in os.listdir(self.directory)
+                    if os.path.isdir(os.path.join(self.directory, entry))]
+        self.assertLessEqual(len(versions), 2)
+
+    def test_update_loads_once(self):
+        student = Student_Registration.objects.create(
+            stu_id='S1', name='Student 1', email='s1@example.com', phone_number='0123456789',
+            designation='Student', department='CSE', profile_image='student_images/S1.jpg')
+        with self.settings(FACE_INDEX_DIR=self.directory), \
+                mock.patch.object(IVFIndex, 'load', wraps=IVFIndex.load) as load:
+            update_face_index(student, deleted=True)
+        self.assertEqual(load.call_count, 1)
+
+    def test_live_embeddings_refresh_index(self):
+        student = Student_Registration.objects.create(
+            stu_id='S1', name='Student 1', email='s1@example.com', phone_number='0123456789',
+            designation='Student', department='CSE', profile_image='student_images/S1.jpg')
+        FaceEmbedding.objects.create(student_registration=student, embedding=self.vectors[0].tobytes(),
+                                     source=FaceEmbedding.CAPTURE)
+        known_faces = KnownFaces(self.vectors[:1], ['Student 1'], [student.pk], ['S1'])
+        face = DetectedFace(box=np.zeros(4), probability=0.999, landmarks=np.zeros((5, 2)),
+                            embedding=self.vectors[1])
+
+        with self.settings(FACE_INDEX_DIR=self.directory):
+            store_live_embeddings(known_faces, [(student.pk, face)])
+        face_index = IVFIndex.load(self.directory)
+        centroid = self.vectors[0] + self.vectors[1]
+        np.testing.assert_allclose(face_index.vectors[face_index.ids == student.pk],
+                                   [centroid / np.linalg.norm(centroid)], rtol=1e-5)
+
+
+@override_settings(FACE_TRACK_REEMBED_INTERVAL=10, FACE_TRACK_MIN_IOU=0.3, FACE_TRACK_STABLE_IOU=0.6,
+                   FACE_TRACK_MIN_PROBABILITY=0.95, FACE_TRACK_MAX_MISSES=2)
+class FaceTrackerTests(SimpleTestCase):
+    """Faces keep their track, and the identity cached on it, while they stay in place."""
+
+    def face(self, x, y, probability=0.99):
+        return DetectedFace(box=np.array([x, y, x + 100, y + 100], dtype=np.float32),
+                            probability=probability, landmarks=np.zeros((5, 2)), embedding=None)
+
+    def test_identity_persists_across_frames(self):
+        tracker = FaceTracker()
+        [first] = tracker.update([self.face(0, 0)])
+        self.assertTrue(first.needs_embedding())
+        first.candidates = []   # embedded and matched
+
+        # Moved a little: same track, no new embedding; a face elsewhere starts its own track
+        moved, other = tracker.update([self.face(5, 0), self.face(400, 0)])
+        self.assertIs(moved, first)
+        self.assertEqual(moved.frames_since_embed, 1)
+        self.assertFalse(moved.needs_embedding())
+        self.assertNotEqual(other.track_id, first.track_id)
+        self.assertTrue(other.needs_embedding())
+
+        # Moved a lot but still overlapping, or detected with low confidence: re-embed
+        [jumped] = tracker.update([self.face(40, 0)])
+        self.assertIs(jumped, first)
+        self.assertTrue(jumped.needs_embedding())
+        [unsure] = tracker.update([self.face(40, 0, probability=0.9)])
+        self.assertIs(unsure, first)
+        self.assertTrue(unsure.needs_embedding())
+
+        # Gone for more than FACE_TRACK_MAX_MISSES frames: it comes back as a new track
+        for _ in range(3):
+            tracker.update([])
+        [returned] = tracker.update([self.face(40, 0)])
+        self.assertNotEqual(returned.track_id, first.track_id)
+        self.assertIsNone(returned.candidates)
+
+
+class BulkEnrollTests(TestCase):
+    """bulk_enroll rejects rows that clash with each other or with enrolled students before any detection."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write_csv(self, rows):
+        path = os.path.join(self.directory, 'students.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stu_id', 'name', 'email', 'department'])
+            writer.writerows(rows)
+        return path
+
+    def test_rejects_duplicates(self):
+        for number, email in ((3, 's3@example.com'), (9, 'taken@example.com')):
+            Student_Registration.objects.create(
+                stu_id=f'S{number}', name=f'Student {number}', email=email, phone_number='0123456789',
+                designation='Student', department='CSE', profile_image=f'student_images/S{number}.jpg')
+        images = os.path.join(self.directory, 'images.zip')
+        jpeg = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))[1].tobytes()
+        with zipfile.ZipFile(images, 'w') as archive:
+            for stu_id in ('S2', 'S3', 'S4'):
+                archive.writestr(f'{stu_id}.jpg', jpeg)
+        csv_file = self.write_csv([
+            ['S1', 'Student 1', 's1@example.com', 'CSE'],       # no image
+            ['S1', 'Student 1 again', 'other@example.com', 'CSE'],
+            ['S2', 'Student 2', 'S1@example.com', 'CSE'],
+            ['S3', 'Student 3', 'new3@example.com', 'CSE'],
+            ['S4', 'Student 4', 'Taken@example.com', 'CSE'],
+        ])
+        rejects = os.path.join(self.directory, 'rejects.csv')
+
+        output = io.StringIO()
+        call_command('bulk_enroll', csv_file, images=images, rejects=rejects, stdout=output)
+        self.assertIn('0 to enroll', output.getvalue())
+
+        with open(rejects, newline='') as f:
+            self.assertEqual(list(csv.reader(f))[1:], [
+                ['2', 'S1', 'image not found'],
+                ['3', 'S1', 'duplicate stu_id in CSV'],
+                ['4', 'S2', 'duplicate email in CSV'],
+                ['5', 'S3', 'duplicate stu_id'],
+                ['6', 'S4', 'duplicate email'],
+            ])
+        self.assertEqual(Student_Registration.objects.count(), 2)
+
+
+class DetectionOptionsTests(SimpleTestCase):
+    """Faces are searched in the scaled-down region of interest and reported in full-frame pixels."""
+
+    # Triangle over the top right of a 200x100 frame: pixels (50, 20), (150, 20), (150, 80)
+    options = DetectionOptions(scale=0.5, roi=((0.25, 0.2), (0.75, 0.2), (0.75, 0.8)))
+
+    def test_prepare(self):
+        image = np.zeros((100, 200, 3), dtype=np.uint8)
+        detection_image, transform, polygon = self.options.prepare(image)
+        self.assertEqual(detection_image.shape, (30, 50, 3))    # the 100x60 bounding box at half size
+        self.assertEqual(transform, (50, 20, 0.5, 0.5))
+        np.testing.assert_array_equal(polygon, [[50, 20], [150, 20], [150, 80]])
+        self.assertEqual(self.options.mtcnn_settings(), (12, (0.6, 0.7, 0.7)))
+
+    def test_detect_maps_back_to_the_frame(self):
+        # Boxes in detection image pixels: one inside the triangle, one only inside its bounding box
+        boxes = np.array([[35, 2.5, 45, 7.5], [2.5, 22.5, 7.5, 27.5]], dtype=np.float32)
+        mtcnn = mock.Mock()
+        mtcnn.detect.return_value = (boxes, np.array([0.99, 0.98]), np.zeros((2, 5, 2), dtype=np.float32))
+        with mock.patch('App1.recognition.engine.get_mtcnn', return_value=mtcnn) as get_mtcnn:
+            [faces] = FaceEngine().detect([np.zeros((100, 200, 3), dtype=np.uint8)], [self.options])
+
+        get_mtcnn.assert_called_once_with(12, (0.6, 0.7, 0.7))
+        self.assertEqual(mtcnn.detect.call_args[0][0].shape, (30, 50, 3))
+        self.assertEqual(len(faces), 1)
+        np.testing.assert_allclose(faces[0].box, [120, 25, 140, 35])
+        np.testing.assert_allclose(faces[0].landmarks, np.tile([50, 20], (5, 1)))
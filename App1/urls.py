@@ -12,8 +12,17 @@ urlpatterns = [
     path('stu_detail/<int:pk>/', views.stu_detail, name='stu_detail'),
     path('stu_delete/<int:pk>/delete/', views.stu_delete, name='stu_delete'),
     path('attendance_list/', views.attendance_list, name='attendance_list'),
+    path('attendance/summary/daily/', views.attendance_summary_daily,
+         name='attendance_summary_daily'),
+    path('attendance/summary/monthly/', views.attendance_summary_monthly,
+         name='attendance_summary_monthly'),
     path('capture_and_recognize/', views.capture_and_recognize,
          name='capture_and_recognize'),
+    path('camera/<int:pk>/start/', views.camera_start, name='camera_start'),
+    path('camera/<int:pk>/stop/', views.camera_stop, name='camera_stop'),
+    path('camera/status/', views.camera_status, name='camera_status'),
+    path('camera/<int:pk>/stream/', views.camera_stream, name='camera_stream'),
+    path('live/events/', views.live_events, name='live_events'),
     path('camera_config/', views.camera_config_create,
          name='camera_config_create'),
     path('camera_config/list/', views.camera_config_list,
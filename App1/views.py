@@ -1,98 +1,33 @@
 # Import necessary Django modules and models
 from django.shortcuts import redirect, render, get_object_or_404
-from .models import Student_Registration, CameraConfiguration, Attendance
+from .models import Student_Registration, FaceEmbedding, CameraConfiguration, CameraStatus, Attendance, format_duration
+from .models import DailyDepartmentSummary, MonthlyStudentSummary
+from .live import live_feed
+from .streaming import sse_message
+from .recognition import (detect_enrolment_face, find_duplicate_students, invalidate_known_faces,
+                          store_embedding, update_face_index)
 from django.contrib import messages
 from django.core.files.base import ContentFile
 import base64
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login, logout
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.conf import settings
-from django.utils.timezone import now
-from facenet_pytorch import InceptionResnetV1, MTCNN
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
 
 # Import necessary libraries
-import os
+import asyncio
+import csv
+import datetime
+import urllib.parse
 import cv2
 import numpy as np
-import pygame
-import torch
-import mtcnn
-import threading
-import time
-
-
-# Initialize MTCNN and InceptionResnetV1
-mtcnn = MTCNN(keep_all=True)
-# Set to evaluation mode
-resnet = InceptionResnetV1(pretrained='vggface2').eval()
-
-
-# ============================================= Function to detect and encode faces ====================================
-def detect_and_encode(image):
-    with torch.no_grad():  # disable gradient calculation for inference
-        boxes, _ = mtcnn.detect(image)
-        if boxes is not None:
-            faces = []
-            for box in boxes:
-                face = image[int(box[1]):int(box[3]), int(
-                    box[0]):int(box[2])]   # Crop the face
-                if face.size == 0:
-                    continue
-                face = cv2.resize(face, (160, 160))         # Resize to 160*160
-                face = np.transpose(face, (2, 0, 1)).astype(
-                    np.float32) / 255.0  # Normalize the face
-                face_tensor = torch.tensor(face).unsqueeze(0)
-                encoding = resnet(face_tensor).detach().numpy().flatten()
-                faces.append(encoding)
-            return faces
-    return []
-
-
-# Function to encode uploaded images
-def encode_uploaded_images():
-    known_face_encodings = []
-    known_face_names = []
-
-    # Fetch only authorized images
-    uploaded_images = Student_Registration.objects.filter(is_active=True)
-
-    # Loop through each uploaded image and encode
-    for student in uploaded_images:
-        image_path = os.path.join(settings.MEDIA_ROOT, str(
-            student.profile_image.name))  # Get the full path
-
-        # Read the image using OpenCV
-        known_image = cv2.imread(image_path)
-        known_image_rgb = cv2.cvtColor(known_image, cv2.COLOR_BGR2RGB)
-        encodings = detect_and_encode(known_image_rgb)
-
-        # Append encodings and names if encoding is successful
-        if encodings:
-            known_face_encodings.extend(encodings)
-            known_face_names.append(student.name)
-
-    # Return the known face encodings and names
-    return known_face_encodings, known_face_names
-
-
-# Function to recognize faces
-# Adjust threshold as needed
-def recognize_faces(known_encodings, known_names, test_encodings, threshold=0.6):
-    recognized_names = []  # List to store recognized names
-
-    # Loop through each test encoding and compare with known encodings
-    for test_encoding in test_encodings:
-        # Calculate Euclidean distances
-        distances = np.linalg.norm(known_encodings - test_encoding, axis=1)
-        min_distance_idx = np.argmin(distances)
-
-        # Check if the minimum distance is below the threshold
-        if distances[min_distance_idx] < threshold:
-            recognized_names.append(known_names[min_distance_idx])
-        else:
-            recognized_names.append('Not Recognized')
-    return recognized_names
 
 
 # ==================================== Helper function to check if user is admin =========================================
@@ -106,6 +41,16 @@ def home(request):
 
 
 # ==================================== View for rendering the student registration page =============================
+# Function to decode a base64 data URL posted by the webcam capture into (JPEG bytes, RGB image)
+def decode_image_data(image_data):
+    header, encoded = image_data.split(',', 1)
+    image_bytes = base64.b64decode(encoded)
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("not an image")
+    return image_bytes, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
 @login_required
 @user_passes_test(is_admin)
 def register_stu(request):
@@ -117,23 +62,40 @@ def register_stu(request):
         designation = request.POST.get('designation')
         department = request.POST.get('department')
         image_data = request.POST.get('image_data')
+        # Extra webcam captures of the same student at other angles
+        extra_image_data = request.POST.getlist('extra_image_data')
 
         # Decode the base64 image data
-        profile_image = None
+        if not image_data:
+            messages.error(request, "No photo was captured. Please try again!")
+            return render(request, 'register_stu.html')
+        try:
+            image_bytes, image = decode_image_data(image_data)
+        except Exception as e:
+            messages.error(
+                request, "Error processing profile image. please try again!")
+            print(f"Error decoding image: {e}")
+            return render(request, 'register_stu.html')
 
-        # Check if image_data is provided
-        if image_data:
+        # Detect and embed the face once, now, and refuse captures the recognizer could not use
+        face, crop, reason = detect_enrolment_face(image)
+        if face is None:
+            messages.error(
+                request, f"Profile photo rejected: {reason}. Please retake it with only the student in view.")
+            return render(request, 'register_stu.html')
+
+        captures = []
+        for extra_data in extra_image_data:
             try:
-                # Split the header and the base64 data
-                header, encoded = image_data.split(',', 1)
-                profile_image = ContentFile(base64.b64decode(
-                    # Decode and create ContentFile
-                    encoded), name=f"{stu_id}.jpg")
+                extra_face, extra_crop, reason = detect_enrolment_face(decode_image_data(extra_data)[1])
             except Exception as e:
-                messages.error(
-                    request, "Error processing profile image. please try again!")
-                print(f"Error decoding image: {e}")
-                return render(request, 'register_stu.html')
+                # A bad extra capture is not fatal; the profile image is still enrolled
+                print(f"Error decoding extra capture: {e}")
+                continue
+            if extra_face is None:
+                print(f"Skipping extra capture of {stu_id}: {reason}")
+                continue
+            captures.append((extra_face, extra_crop))
 
         # Create a new Student_Registration instance
         student_registration = Student_Registration(
@@ -143,21 +105,53 @@ def register_stu(request):
             phone_number=phone_number,
             designation=designation,
             department=department,
-            profile_image=profile_image,
+            profile_image=ContentFile(image_bytes, name=f"{stu_id}.jpg"),
             is_active=True
         )
 
         # Save the student registration data to the database
+        embeddings = []
         try:
-            student_registration.save()
-            messages.success(request, "Student Registered Successfully")
-            return redirect('register_success')
+            duplicates = find_duplicate_students(
+                [face.embedding] + [extra_face.embedding for extra_face, _ in captures])
+
+            # Store the student with the embeddings computed above; no image is decoded again
+            with transaction.atomic():
+                student_registration.save()
+                embeddings.append(store_embedding(
+                    student_registration, face, FaceEmbedding.PROFILE,
+                    source_image=student_registration.profile_image.name, crop=crop))
+                for extra_face, extra_crop in captures:
+                    embeddings.append(store_embedding(
+                        student_registration, extra_face, FaceEmbedding.CAPTURE, crop=extra_crop))
         except Exception as e:
+            # The rows were rolled back; remove the image files written for them
+            if student_registration.profile_image._committed:
+                student_registration.profile_image.delete(save=False)
+            for embedding in embeddings:
+                if embedding.face_image:
+                    embedding.face_image.delete(save=False)
             messages.error(
                 request, "Error saving student registration. Please try again.")
             print(f"Error saving student registration: {e}")
             return render(request, 'register_stu.html')
 
+        # The student is saved; the recognizer catches up on its next gallery or index rebuild if this fails
+        try:
+            update_face_index(student_registration)
+        except Exception as e:
+            print(f"Error adding {stu_id} to the face index: {e}")
+        try:
+            invalidate_known_faces()
+        except Exception as e:
+            print(f"Error invalidating the known faces after registering {stu_id}: {e}")
+
+        if duplicates:
+            messages.warning(request, "Possible duplicate enrolment: this face matches " + ", ".join(
+                f"{match.name} ({match.stu_id})" for match in duplicates) + ". Please check before approving.")
+        messages.success(request, "Student Registered Successfully")
+        return redirect('register_success')
+
     return render(request, 'register_stu.html')
 
 
@@ -207,173 +201,163 @@ def stu_authorize(request, pk):
         authorized = request.POST.get('authorized', False)
         stu.is_active = bool(authorized)  # Update the 'is_active' field
         stu.save()
+        update_face_index(stu)
+        invalidate_known_faces()
         return redirect('stu_detail', pk=pk)
 
     return render(request, 'stu_authorize.html', {'stu': stu})
 
 
-# ============================== view for capturing and recognizing faces from multiple cameras ===========================
+# ============================== Views for controlling cameras in the recognizer service ===========================
+# Cameras run in the long-lived `manage.py run_recognizer` process. These views only flip
+# CameraConfiguration.is_enabled and read the CameraStatus rows the service writes, so they never block.
+def camera_status_data(config):
+    try:
+        status = config.status
+    except CameraStatus.DoesNotExist:
+        status = CameraStatus(camera=config)
+    alive = status.is_alive(settings.RECOGNIZER_POLL_INTERVAL * 5)
+    return {
+        'id': config.pk,
+        'name': config.name,
+        'is_enabled': config.is_enabled,
+        'state': status.state if alive else CameraStatus.STOPPED,
+        'message': status.message,
+        'last_heartbeat': status.last_heartbeat.isoformat() if status.last_heartbeat else None,
+        'service_alive': alive,
+        'stats': status.stats,
+    }
+
+
+@login_required
+@user_passes_test(is_admin)
 def capture_and_recognize(request):
-    stop_events = []  # List to store stop events for each thread
-    camera_threads = []  # List to store threads for each camera
-    camera_windows = []  # List to store window names
-    error_messages = []  # List to capture errors from threads
-
-    # Thread function to process frames from a camera
-    def process_frame(cam_config, stop_event):
-        """Thread function to capture and process frames for each camera."""
-        cap = None  # Initialize cap to None
-        window_created = False  # Flag to track if the window was created
+    # Start or stop every camera at once
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action in ('start', 'stop'):
+            CameraConfiguration.objects.update(is_enabled=(action == 'start'))
+        return redirect('capture_and_recognize')
+
+    configs = CameraConfiguration.objects.select_related('status')
+    if not configs.exists():
+        return render(request, 'error.html', {
+            'error_message': "No camera configurations found. Please configure them in the admin panel."})
+
+    cameras = [camera_status_data(config) for config in configs]
+    return render(request, 'capture_and_recognize.html', {
+        'cameras': cameras,
+        'service_alive': any(camera['service_alive'] for camera in cameras),
+    })
+
+
+# ============================== View for starting a single camera ===========================
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def camera_start(request, pk):
+    CameraConfiguration.objects.filter(pk=pk).update(is_enabled=True)
+    return redirect('capture_and_recognize')
+
+
+# ============================== View for stopping a single camera ===========================
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def camera_stop(request, pk):
+    CameraConfiguration.objects.filter(pk=pk).update(is_enabled=False)
+    return redirect('capture_and_recognize')
+
+
+# ============================== View for reporting camera status as JSON ===========================
+@login_required
+@user_passes_test(is_admin)
+def camera_status(request):
+    configs = CameraConfiguration.objects.select_related('status')
+    return JsonResponse({'cameras': [camera_status_data(config) for config in configs]})
+
+
+# ============================== View for relaying a camera's live view ===========================
+# The recognizer serves the annotated MJPEG stream (App1/streaming.py); relaying it here keeps it
+# behind the admin login. The recognizer only encodes frames while a relay like this is open.
+@login_required
+@user_passes_test(is_admin)
+async def camera_stream(request, pk):
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for as long as the viewer watches
+        return HttpResponse("The live view needs the ASGI server.", status=501)
+
+    # Async relay: an open viewer costs a socket on the event loop, not a worker or a thread
+    upstream = urllib.parse.urlsplit(settings.RECOGNIZER_STREAM_URL)
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(upstream.hostname, upstream.port or 80), timeout=10)
+        writer.write(f"GET /cameras/{pk}/stream.mjpg HTTP/1.0\r\nHost: {upstream.netloc}\r\n\r\n".encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        if writer is not None:
+            writer.close()
+        return HttpResponse("The recognizer live view is not running.", status=503)
+
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(':', 1) for line in header_lines if ':' in line)
+    headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+    if status_line.split()[1:2] != ['200']:
+        writer.close()
+        return HttpResponse("This camera has no live view.", status=404)
+
+    async def relay():
         try:
-            # Check if the camera source is a number (local webcam) or a string (IP camera URL)
-            if cam_config.camera_source.isdigit():
-                # Use integer index for webcam
-                cap = cv2.VideoCapture(int(cam_config.camera_source))
-            else:
-                # Use string for IP camera URL
-                cap = cv2.VideoCapture(cam_config.camera_source)
-
-            # Check if the camera opened successfully
-            if not cap.isOpened():
-                raise Exception(f"Unable to access camera {cam_config.name}.")
-
-            # Get the threshold from camera configuration
-            threshold = cam_config.threshold
-
-            # Initialize pygame mixer for sound playback
-            pygame.mixer.init()
-            success_sound = pygame.mixer.Sound(
-                'App1/suc.wav')  # Load sound path
-
-            # Define unique window name for each camera
-            window_name = f'Face Recognition - {cam_config.name}'
-            camera_windows.append(window_name)  # Track the window name
-
-            while not stop_event.is_set():      # Continue until stop_event is set
-                ret, frame = cap.read()
-                if not ret:
-                    print(
-                        f"Failed to capture frame for camera: {cam_config.name}")
-                    break  # If frame capture fails, break from the loop
-
-                # Convert BGR to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # Function to detect and encode face in frame
-                test_face_encodings = detect_and_encode(frame_rgb)
-
-                if test_face_encodings:
-                    # Load known face encodings once
-                    known_face_encodings, known_face_names = encode_uploaded_images()
-                    if known_face_encodings:
-                        names = recognize_faces(np.array(
-                            known_face_encodings), known_face_names, test_face_encodings, threshold)
-
-                        # Draw bounding boxes and names on the frame
-                        for name, box in zip(names, mtcnn.detect(frame_rgb)[0]):
-                            if box is not None:
-
-                                # Draw rectangle and put text
-                                (x1, y1, x2, y2) = map(int, box)
-                                cv2.rectangle(frame, (x1, y1),
-                                              (x2, y2), (0, 255, 0), 2)
-                                cv2.putText(
-                                    frame, name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-
-                                if name != 'Not Recognized':
-                                    students = Student_Registration.objects.filter(
-                                        name=name)
-                                    if students.exists():
-                                        student = students.first()
-
-                                        # Get current time
-                                        current_time = now()
-
-                                        # Manage attendance based on check-in and check-out logic
-                                        attendance, created = Attendance.objects.get_or_create(
-                                            student_registration=student, date=now().date())
-                                        if created:
-                                            attendance.mark_check_in()
-                                            success_sound.play()
-                                            cv2.putText(frame, f"{name}, checked in.", (
-                                                50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-                                        else:
-                                            if attendance.check_in_time and not attendance.check_out_time:
-                                                # Check out logic: check if 1 minute has passed after check-in
-                                                time_diff = current_time - attendance.check_in_time
-                                                if time_diff.total_seconds() > 60:  # 1 minute after check-in
-                                                    attendance.mark_check_out()
-                                                    success_sound.play()
-                                                    cv2.putText(frame, f"{name}, checked out.", (
-                                                        50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-                                                else:
-                                                    cv2.putText(frame, f"{name}, already checked in.", (
-                                                        50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-                                            elif attendance.check_in_time and attendance.check_out_time:
-                                                cv2.putText(frame, f"{name}, already checked out.", (
-                                                    50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-
-                # Display frame in separate window for each camera
-                if not window_created:
-                    cv2.namedWindow(window_name)  # Only create window once
-                    window_created = True  # Mark window as created
-
-                cv2.imshow(window_name, frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    stop_event.set()  # Signal the thread to stop when 'q' is pressed
-                    break
+            while True:
+                chunk = await reader.read(64 * 1024)   # pass each frame on as soon as it arrives
+                if not chunk:
+                    break   # camera stopped sending frames or the recognizer went away
+                yield chunk
+        except OSError:
+            pass
+        finally:
+            writer.close()
 
-        except Exception as e:
-            print(f"Error in thread for {cam_config.name}: {e}")
-            error_messages.append(str(e))  # Capture error message
+    response = StreamingHttpResponse(relay(), content_type=headers.get('content-type'))
+    response['Cache-Control'] = 'no-cache, private'
+    response['X-Accel-Buffering'] = 'no'    # nginx: pass frames on without buffering
+    return response
+
+
+# ============================== View for streaming live dashboard events ===========================
+# Async view (serve the project over ASGI, e.g. `uvicorn AutoAttend_AI.asgi:application`) that
+# sends Server-Sent Events: 'attendance' for every check-in/check-out, 'camera' with each
+# camera's health every poll interval and 'recognizer' when the service comes or goes. Events
+# come from the in-process live feed, so an open dashboard costs no database queries.
+@login_required
+@user_passes_test(is_admin)
+async def live_events(request):
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream; the dashboard falls back to polling
+        return HttpResponse("Live events need the ASGI server.", status=501)
+
+    async def stream():
+        subscriber, snapshot = live_feed.subscribe()
+        try:
+            for event, data in snapshot:
+                yield sse_message(event, data)
+            messages = subscriber[1]
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(messages.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"   # keeps proxies from closing an idle stream
+                    continue
+                yield sse_message(event, data)
         finally:
-            if cap is not None:
-                cap.release()
-            if window_created:
-                # Only destroy if window was created
-                cv2.destroyWindow(window_name)
+            live_feed.unsubscribe(subscriber)
 
-    try:
-        # Get all camera configurations
-        cam_configs = CameraConfiguration.objects.all()
-        if not cam_configs.exists():
-            raise Exception(
-                "No camera configurations found. Please configure them in the admin panel.")
-
-        # Create threads for each camera configuration
-        for cam_config in cam_configs:
-            stop_event = threading.Event()
-            stop_events.append(stop_event)
-
-            camera_thread = threading.Thread(
-                target=process_frame, args=(cam_config, stop_event))
-            camera_threads.append(camera_thread)
-            camera_thread.start()
-
-        # Keep the main thread running while cameras are being processed
-        while any(thread.is_alive() for thread in camera_threads):
-            time.sleep(1)  # Non-blocking wait, allowing for UI responsiveness
-
-    except Exception as e:
-        error_messages.append(str(e))  # Capture the error message
-    finally:
-        # Ensure all threads are signaled to stop
-        for stop_event in stop_events:
-            stop_event.set()
-
-        # Ensure all windows are closed in the main thread
-        for window in camera_windows:
-            # Check if window exists
-            if cv2.getWindowProperty(window, cv2.WND_PROP_VISIBLE) >= 1:
-                cv2.destroyWindow(window)
-
-    # Check if there are any error messages
-    if error_messages:
-        # Join all error messages into a single string
-        full_error_message = "\n".join(error_messages)
-        # Render the error page with message
-        return render(request, 'error.html', {'error_message': full_error_message})
-
-    return redirect('attendance_list')
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'    # nginx: pass events on without buffering
+    return response
 
 
 # ==================================== View for deleting a student =====================================
@@ -383,7 +367,9 @@ def stu_delete(request, pk):
     stu = get_object_or_404(Student_Registration, pk=pk)
 
     if request.method == 'POST':
+        update_face_index(stu, deleted=True)
         stu.delete()
+        invalidate_known_faces()
         messages.success(request, 'Student deleted successfully.')
         # Redirect to the student list after deletion
         return redirect('stu_list')
@@ -399,62 +385,203 @@ def stu_detail(request, pk):
     return render(request, 'stu_detail.html', {'stu': stu})
 
 
+# =============================== Streaming CSV export of attendance records ================================
+# Pseudo-buffer for csv.writer: returns each formatted line instead of storing it
+class Echo:
+    def write(self, value):
+        return value
+
+
+# Function to stream attendance records as CSV without holding the export in memory
+def attendance_csv_response(attendance_records):
+    # Only the exported columns are read, and the stayed time is computed by the database
+    rows = attendance_records.annotate(
+        stayed=ExpressionWrapper(F('check_out_time') - F('check_in_time'), output_field=DurationField()),
+    ).values_list(
+        'student_registration__name', 'student_registration__stu_id', 'date',
+        'check_in_time', 'check_out_time', 'stayed',
+    ).iterator(chunk_size=settings.ATTENDANCE_EXPORT_CHUNK_SIZE)
+
+    def stream():
+        writer = csv.writer(Echo())
+        yield writer.writerow(['Stu Name', 'Stu ID', 'Date',
+                               'Check-in Time', 'Check-out Time', 'Stayed Time'])
+        for name, stu_id, date, check_in_time, check_out_time, stayed in rows:
+            yield writer.writerow([name, stu_id, date, check_in_time, check_out_time,
+                                   format_duration(stayed) if stayed is not None else ''])
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="attendance_report.csv"'
+    return response
+
+
+# Function to read a YYYY-MM-DD query parameter; None when it is empty or not a real date
+def parse_date_param(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None     # well formed but impossible, like 2024-02-30
+
+
 # =============================== View for rendering the attendance list page ================================
 @login_required
 @user_passes_test(is_admin)
 def attendance_list(request):
+    # Current filters, carried over by the pagination and download links
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
+    filter_params.pop('download_report', None)
+
+    # Invalid dates are dropped with a message instead of reaching the query
+    dates = {}
+    for param in ('attendance_date', 'start_date', 'end_date'):
+        value = request.GET.get(param, '').strip()
+        dates[param] = parse_date_param(value)
+        if value and dates[param] is None:
+            messages.error(request, f"Ignored the invalid date {value!r}; dates are written YYYY-MM-DD.")
+            filter_params.pop(param, None)
+
     # Handle search and date filter from GET params
     search_query = request.GET.get('search', '').strip()
-    date_filter = request.GET.get('attendance_date', '').strip()
+    date_filter = dates['attendance_date']
+    start_date = dates['start_date']
+    end_date = dates['end_date']
+    department = request.GET.get('department', '').strip()
+    designation = request.GET.get('designation', '').strip()
     download_report = request.GET.get('download_report', '')
 
-    students = Student_Registration.objects.all()
+    # One joined query over the attendance rows; the student of each row comes with it
+    attendance_records = Attendance.objects.select_related(
+        'student_registration').order_by('-date', 'student_registration__name', 'pk')
     if search_query:
         # you can extend to stu_id or email
-        students = students.filter(name__icontains=search_query)
-
-    students_attendance_data = []
-    for stu in students:
-        if date_filter:
-            attendance_qs = stu.attendances.filter(date=date_filter)
-        else:
-            attendance_qs = stu.attendances.all()
-
-        # Only include students with at least one attendance record
-        if attendance_qs.exists():
-            students_attendance_data.append(
-                {'students': stu, 'attendance_records': attendance_qs})
-
-    # If user requested a CSV download, generate and return it
+        attendance_records = attendance_records.filter(
+            student_registration__name__icontains=search_query)
+    if date_filter:
+        attendance_records = attendance_records.filter(date=date_filter)
+    if start_date:
+        attendance_records = attendance_records.filter(date__gte=start_date)
+    if end_date:
+        attendance_records = attendance_records.filter(date__lte=end_date)
+    if department:
+        attendance_records = attendance_records.filter(
+            student_registration__department__iexact=department)
+    if designation:
+        attendance_records = attendance_records.filter(
+            student_registration__designation__iexact=designation)
+
+    # If user requested a CSV download, stream it
     if download_report.lower() == 'true':
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="attendance_report.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Stu Name', 'Stu ID', 'Date',
-                        'Check-in Time', 'Check-out Time', 'Stayed Time'])
-
-        for item in students_attendance_data:
-            stu = item['students']
-            for attendance in item['attendance_records']:
-                stayed = attendance.calculate_duration() if (
-                    attendance.check_in_time and attendance.check_out_time) else ''
-                writer.writerow([stu.name, stu.stu_id, attendance.date,
-                                attendance.check_in_time, attendance.check_out_time, stayed])
+        return attendance_csv_response(attendance_records)
 
-        return response
+    # Show one page of records at a time
+    paginator = Paginator(attendance_records, settings.ATTENDANCE_PAGE_SIZE)
+    page_obj = paginator.get_page(request.GET.get('page'))
 
     context = {
-        'students_attendance_data': students_attendance_data,
+        'page_obj': page_obj,
         'search_query': search_query,
-        'date_filter': date_filter,
+        'date_filter': date_filter.isoformat() if date_filter else '',
+        'start_date': start_date.isoformat() if start_date else '',
+        'end_date': end_date.isoformat() if end_date else '',
+        'department': department,
+        'designation': designation,
+        'filter_query': filter_params.urlencode(),
     }
 
     return render(request, 'attendance_list.html', context)
 
 
+# ============================== Views for the precomputed attendance summaries (JSON) ===========================
+# Daily present counts and average stay per department, read from DailyDepartmentSummary
+@login_required
+@user_passes_test(is_admin)
+def attendance_summary_daily(request):
+    today = timezone.localdate()
+    try:
+        start_date = parse_date(request.GET.get('start_date', '')) or today - datetime.timedelta(days=30)
+        end_date = parse_date(request.GET.get('end_date', '')) or today
+    except ValueError:
+        # Well formed but impossible, like 2024-02-30
+        return JsonResponse({'error': "start_date and end_date must be real dates (YYYY-MM-DD)."}, status=400)
+    department = request.GET.get('department', '').strip()
+
+    summaries = DailyDepartmentSummary.objects.filter(
+        date__gte=start_date, date__lte=end_date).order_by('date', 'department')
+    if department:
+        summaries = summaries.filter(department__iexact=department)
+
+    return JsonResponse({
+        'start_date': start_date,
+        'end_date': end_date,
+        'days': [{
+            'date': summary.date,
+            'department': summary.department,
+            'present': summary.present_count,
+            'checked_out': summary.checked_out_count,
+            'average_stay_seconds': summary.average_stay_seconds(),
+        } for summary in summaries],
+    })
+
+
+# Days present and average stay per student for one month, read from MonthlyStudentSummary
+@login_required
+@user_passes_test(is_admin)
+def attendance_summary_monthly(request):
+    try:
+        month = parse_date(request.GET.get('month', '') + '-01') or timezone.localdate().replace(day=1)
+    except ValueError:
+        # Well formed but impossible, like 2024-13
+        return JsonResponse({'error': "month must be a real month (YYYY-MM)."}, status=400)
+    department = request.GET.get('department', '').strip()
+
+    summaries = MonthlyStudentSummary.objects.filter(month=month).select_related(
+        'student_registration').order_by('student_registration__name')
+    if department:
+        summaries = summaries.filter(student_registration__department__iexact=department)
+
+    return JsonResponse({
+        'month': month.strftime('%Y-%m'),
+        'students': [{
+            'stu_id': summary.student_registration.stu_id,
+            'name': summary.student_registration.name,
+            'department': summary.student_registration.department,
+            'days_present': summary.days_present,
+            'days_checked_out': summary.days_checked_out,
+            'average_stay_seconds': summary.average_stay_seconds(),
+        } for summary in summaries],
+    })
+
+
+# Function to parse the region of interest typed in the camera form: "x,y; x,y; ..." as fractions of the frame
+def parse_roi(text):
+    roi = []
+    for point in (text or '').split(';'):
+        if not point.strip():
+            continue
+        try:
+            x, y = (float(value) for value in point.split(','))
+        except ValueError:
+            # Three coordinates, one, or text that is not a number
+            raise ValueError(f"Each region of interest point must be x,y; got {point.strip()!r}.")
+        if not (0 <= x <= 1 and 0 <= y <= 1):
+            raise ValueError("Region of interest points must be fractions of the frame between 0 and 1.")
+        roi.append([x, y])
+    if 0 < len(roi) < 3:
+        raise ValueError("A region of interest needs at least 3 points.")
+    return roi
+
+
+# Function to copy the face detection fields of the camera form onto a configuration
+def set_detection_options(config, data):
+    config.detection_scale = data.get('detection_scale') or 1.0
+    config.min_face_size = data.get('min_face_size') or 20
+    config.pnet_threshold = data.get('pnet_threshold') or 0.6
+    config.rnet_threshold = data.get('rnet_threshold') or 0.7
+    config.onet_threshold = data.get('onet_threshold') or 0.7
+    config.roi = parse_roi(data.get('roi'))
+
+
 # ============================== view for rendering the camera_config_list template page ===========================
 @login_required
 @user_passes_test(is_admin)
@@ -465,26 +592,42 @@ def camera_config_create(request):
         name = request.POST.get('name')
         camera_source = request.POST.get('camera_source')
         threshold = request.POST.get('threshold')
+        ann_nprobe = request.POST.get('ann_nprobe') or 0
+        target_fps = request.POST.get('target_fps') or 0
+        frame_skip = request.POST.get('frame_skip') or 0
+        engine = request.POST.get('engine') or CameraConfiguration.FACENET
 
         try:
             # Save the data to the database using the CameraConfiguration model
-            CameraConfiguration.objects.create(
+            config = CameraConfiguration(
                 name=name,
                 camera_source=camera_source,
                 threshold=threshold,
+                ann_nprobe=ann_nprobe,
+                target_fps=target_fps,
+                frame_skip=frame_skip,
+                engine=engine,
             )
+            set_detection_options(config, request.POST)
+            config.save()
             # Redirect to the list of camera configurations after successful creation
             return redirect('camera_config_list')
 
+        except ValueError as e:
+            messages.error(request, str(e))
+            return render(request, 'camera_config_form.html',
+                          {'engine_choices': CameraConfiguration.ENGINE_CHOICES})
         except IntegrityError:
             # Handle the case where a configuration with the same name already exists
             messages.error(
                 request, "A configuration with this name already exists.")
             # Render the form again to allow user to correct the error
-            return render(request, 'camera_config_form.html')
+            return render(request, 'camera_config_form.html',
+                          {'engine_choices': CameraConfiguration.ENGINE_CHOICES})
 
     # Render the camera configuration form for GET requests
-    return render(request, 'camera_config_form.html')
+    return render(request, 'camera_config_form.html',
+                  {'engine_choices': CameraConfiguration.ENGINE_CHOICES})
 
 
 # ==================================== View for rendering the camera_config_list template page ====================================
@@ -510,7 +653,17 @@ def camera_config_update(request, pk):
         config.name = request.POST.get('name')
         config.camera_source = request.POST.get('camera_source')
         config.threshold = request.POST.get('threshold')
+        config.ann_nprobe = request.POST.get('ann_nprobe') or 0
+        config.target_fps = request.POST.get('target_fps') or 0
+        config.frame_skip = request.POST.get('frame_skip') or 0
+        config.engine = request.POST.get('engine') or CameraConfiguration.FACENET
         config.success_sound_path = request.POST.get('success_sound_path')
+        try:
+            set_detection_options(config, request.POST)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return render(request, 'camera_config_form.html',
+                          {'config': config, 'engine_choices': CameraConfiguration.ENGINE_CHOICES})
 
         # Save the changes to the database
         config.save()
@@ -519,7 +672,8 @@ def camera_config_update(request, pk):
         return redirect('camera_config_list')
 
     # Render the configuration form with the current configuration data for GET requests
-    return render(request, 'camera_config_form.html', {'config': config})
+    return render(request, 'camera_config_form.html',
+                  {'config': config, 'engine_choices': CameraConfiguration.ENGINE_CHOICES})
 
 # ============================= View for deleting an existing camera configuration ===================================
 @login_required
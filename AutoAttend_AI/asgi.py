@@ -5,12 +5,21 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve it with an ASGI server so the async live-events view can stream, e.g.
+``uvicorn AutoAttend_AI.asgi:application``.
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AutoAttend_AI.settings')
 
 application = get_asgi_application()
+
+# Serve static files in development, as runserver does
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
@@ -143,4 +143,73 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-LOGIN_URL = 'user_login'  # Example: 'login' if your login URL is '/login/'
\ No newline at end of file
+LOGIN_URL = 'user_login'  # Example: 'login' if your login URL is '/login/'
+
+# Attendance records shown per page of the attendance list
+ATTENDANCE_PAGE_SIZE = int(os.environ.get('ATTENDANCE_PAGE_SIZE', 50))
+# Rows fetched from the database at a time while streaming the CSV report
+ATTENDANCE_EXPORT_CHUNK_SIZE = int(os.environ.get('ATTENDANCE_EXPORT_CHUNK_SIZE', 2000))
+
+# Face recognition
+# Face engine used for enrolment (cameras choose theirs in CameraConfiguration.engine) and the
+# exported embedder files used by the torchscript, torchscript_int8 and onnx engines
+FACE_ENGINE = os.environ.get('FACE_ENGINE', 'facenet')
+FACE_MODEL_DIR = os.environ.get('FACE_MODEL_DIR', os.path.join(BASE_DIR, 'face_models'))
+FACE_TORCHSCRIPT_MODEL = os.path.join(FACE_MODEL_DIR, 'inception_resnet_v1.pt')
+FACE_TORCHSCRIPT_INT8_MODEL = os.path.join(FACE_MODEL_DIR, 'inception_resnet_v1_int8.pt')
+FACE_ONNX_MODEL = os.path.join(FACE_MODEL_DIR, 'inception_resnet_v1.onnx')
+# Maximum number of face crops embedded in a single InceptionResnetV1 forward pass
+FACE_EMBED_BATCH_SIZE = int(os.environ.get('FACE_EMBED_BATCH_SIZE', 32))
+# Number of known faces compared per matrix product; bounds matcher memory on large galleries
+FACE_MATCH_CHUNK_SIZE = int(os.environ.get('FACE_MATCH_CHUNK_SIZE', 8192))
+# Approximate nearest-neighbour index over face embeddings, used by cameras with ann_nprobe > 0
+FACE_INDEX_DIR = os.path.join(MEDIA_ROOT, 'face_index')
+# Touched whenever enrolment changes so every process reloads its known-face gallery
+FACE_GALLERY_VERSION_FILE = os.path.join(FACE_INDEX_DIR, 'gallery.version')
+# Galleries smaller than this are always searched exactly
+FACE_INDEX_MIN_GALLERY = int(os.environ.get('FACE_INDEX_MIN_GALLERY', 2000))
+# High-confidence live recognitions are kept as extra embeddings of the student (0 disables)
+FACE_MAX_LIVE_EMBEDDINGS = int(os.environ.get('FACE_MAX_LIVE_EMBEDDINGS', 3))
+FACE_LIVE_CAPTURE_DISTANCE = float(os.environ.get('FACE_LIVE_CAPTURE_DISTANCE', 0.4))
+FACE_LIVE_CAPTURE_PROBABILITY = float(os.environ.get('FACE_LIVE_CAPTURE_PROBABILITY', 0.99))
+# A new student whose face is closer than this to an enrolled student is flagged as a duplicate
+FACE_DUPLICATE_DISTANCE = float(os.environ.get('FACE_DUPLICATE_DISTANCE', 0.6))
+# Face tracking between frames: a tracked face is re-embedded every FACE_TRACK_REEMBED_INTERVAL
+# frames, or sooner when its box moves (IoU below FACE_TRACK_STABLE_IOU) or its detection
+# probability drops; boxes overlapping less than FACE_TRACK_MIN_IOU start a new track
+FACE_TRACK_REEMBED_INTERVAL = int(os.environ.get('FACE_TRACK_REEMBED_INTERVAL', 10))
+FACE_TRACK_MIN_IOU = float(os.environ.get('FACE_TRACK_MIN_IOU', 0.3))
+FACE_TRACK_STABLE_IOU = float(os.environ.get('FACE_TRACK_STABLE_IOU', 0.6))
+FACE_TRACK_MIN_PROBABILITY = float(os.environ.get('FACE_TRACK_MIN_PROBABILITY', 0.95))
+# Frames a track survives without a matching detection
+FACE_TRACK_MAX_MISSES = int(os.environ.get('FACE_TRACK_MAX_MISSES', 5))
+
+# Recognizer service (manage.py run_recognizer)
+# Seconds between checks of camera start/stop requests and status updates
+RECOGNIZER_POLL_INTERVAL = float(os.environ.get('RECOGNIZER_POLL_INTERVAL', 2))
+# Seconds to wait before restarting a camera that stopped unexpectedly
+RECOGNIZER_RESTART_DELAY = float(os.environ.get('RECOGNIZER_RESTART_DELAY', 5))
+# Frames buffered per camera between the capture and inference stages; when the queue is
+# full the oldest frame is dropped, so 1 means inference always gets the newest frame
+RECOGNIZER_FRAME_QUEUE_SIZE = int(os.environ.get('RECOGNIZER_FRAME_QUEUE_SIZE', 1))
+# Inference worker threads shared by all cameras, and the most frames one of them batches together
+RECOGNIZER_INFERENCE_WORKERS = int(os.environ.get('RECOGNIZER_INFERENCE_WORKERS', 1))
+RECOGNIZER_MAX_BATCH_FRAMES = int(os.environ.get('RECOGNIZER_MAX_BATCH_FRAMES', 8))
+# torch intra-op threads (0 splits the CPU cores evenly between inference workers)
+RECOGNIZER_TORCH_THREADS = int(os.environ.get('RECOGNIZER_TORCH_THREADS', 0))
+# The attendance writer batches check-ins/check-outs into one transaction every
+# ATTENDANCE_FLUSH_INTERVAL_MS milliseconds or once ATTENDANCE_FLUSH_MAX_EVENTS rows changed
+ATTENDANCE_FLUSH_INTERVAL_MS = int(os.environ.get('ATTENDANCE_FLUSH_INTERVAL_MS', 500))
+ATTENDANCE_FLUSH_MAX_EVENTS = int(os.environ.get('ATTENDANCE_FLUSH_MAX_EVENTS', 50))
+# Show an OpenCV window per camera on the recognizer host (needs a desktop session)
+RECOGNIZER_SHOW_WINDOWS = os.environ.get(
+    'RECOGNIZER_SHOW_WINDOWS', 'False').lower() in ('1', 'true', 'yes')
+# Live view: the recognizer serves annotated MJPEG streams on this address (port 0 disables it)
+# and the web app relays them from RECOGNIZER_STREAM_URL. Frames are downscaled to at most
+# RECOGNIZER_STREAM_MAX_WIDTH pixels and only encoded while someone watches.
+RECOGNIZER_STREAM_HOST = os.environ.get('RECOGNIZER_STREAM_HOST', '127.0.0.1')
+RECOGNIZER_STREAM_PORT = int(os.environ.get('RECOGNIZER_STREAM_PORT', 8765))
+RECOGNIZER_STREAM_URL = os.environ.get(
+    'RECOGNIZER_STREAM_URL', f'http://{RECOGNIZER_STREAM_HOST}:{RECOGNIZER_STREAM_PORT}')
+RECOGNIZER_STREAM_MAX_WIDTH = int(os.environ.get('RECOGNIZER_STREAM_MAX_WIDTH', 640))
+RECOGNIZER_STREAM_JPEG_QUALITY = int(os.environ.get('RECOGNIZER_STREAM_JPEG_QUALITY', 70))